@@ -0,0 +1,8 @@
+#!/bin/bash
+for file in $(find tests -type f -name "bench_*.py" | sort)
+do
+  module=$(echo "${file%.py}" | tr / .)
+  echo "Running ${module}"
+  python3 -m ${module}
+  echo ""
+done
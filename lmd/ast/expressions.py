@@ -5,6 +5,7 @@ from lmd.cooking.tokens import *
 from lmd.ast.nodes import *
 from lmd.ast.transformer import ASTTransformer
 from lmd.util.error import *
+from lmd.util.symbol import SymbolTable
 
 
 class Associativity(Enum):
@@ -21,8 +22,15 @@ class Precedence:
 
 
 class ExpressionTransformer(ASTTransformer):
-    def __init__(self, precedence_table):
-        self.precedence_table = precedence_table
+    operator_kind = Operator()
+
+    def __init__(self, precedence_table, symbols: SymbolTable):
+        self.symbols = symbols
+        # Keyed by the symbol ids of the operators
+        self.precedence_table = {
+            symbols.intern(operator): precedence
+            for operator, precedence in precedence_table.items()
+        }
         self.failed = False
 
     def transform(self, ast, report):
@@ -47,7 +55,7 @@ class ExpressionTransformer(ASTTransformer):
             operator = nodes[0]
             nodes = nodes[1:]
 
-            if operator.token.text not in self.precedence_table:
+            if self.symbols.of(operator.token) not in self.precedence_table:
                 self.unknown_operator(operator)
                 return None, None
 
@@ -69,7 +77,7 @@ class ExpressionTransformer(ASTTransformer):
             return node, nodes
 
     def is_operator(self, node):
-        return isinstance(node, TokenNode) and node.token.kind.extends(Operator())
+        return isinstance(node, TokenNode) and node.token.kind.extends(self.operator_kind)
 
     def right_op_first(self, left, right):
         '''
@@ -82,8 +90,8 @@ class ExpressionTransformer(ASTTransformer):
         if left is None:
             return True
 
-        left_op = left.token.text
-        right_op = right.token.text
+        left_op = self.symbols.of(left.token)
+        right_op = self.symbols.of(right.token)
 
         if right_op not in self.precedence_table:
             self.unknown_operator(right)
@@ -111,6 +119,6 @@ BUILT_IN_PRECEDENCE_TABLE = {
 }
 
 
-def transform_expressions(ast, report):
-    transformer = ExpressionTransformer(BUILT_IN_PRECEDENCE_TABLE)
+def transform_expressions(ast, report, symbols: SymbolTable):
+    transformer = ExpressionTransformer(BUILT_IN_PRECEDENCE_TABLE, symbols)
     return transformer.transform(ast, report)
@@ -1,3 +1,4 @@
 from . import error
 from . import tokens
 from . import cook
+from . import trivia
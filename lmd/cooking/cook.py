@@ -1,50 +1,100 @@
-from typing import List, Tuple
+import re
+
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Tuple
 
 from lmd.lexing import *
 
 from lmd.util.token import Token
+from lmd.util.symbol import SymbolTable
 from lmd.util.error import *
 
 from lmd.cooking.tokens import *
 from lmd.cooking.error import *
 
 
-def cook_tokens(tokens: List[Token], error_report: ErrorReport) -> List[Token]:
-    cooked = []
-    kind_to_cooker = [
-        (raw_token.Whitespace(), cook_whitespace),
-        (raw_token.TokenKind(raw_token.RawTokenType.COMMENT), cook_comment),
-        (raw_token.TokenKind(raw_token.RawTokenType.LITERAL), cook_literal),
-        (raw_token.Name(), cook_name),
-        (raw_token.Delimiter(), cook_delimiter),
-        (raw_token.Operator(), cook_operator_or_symbol),
-        (raw_token.Symbol(), cook_operator_or_symbol),
-        (raw_token.Unknown(), cook_unknown),
-    ]
+def cook_tokens(tokens: List[Token], error_report: ErrorReport,
+                symbols: SymbolTable = None) -> List[Token]:
+    return list(iter_cooked(tokens, error_report, symbols))
+
 
+def iter_cooked(tokens: Iterable[Token], error_report: ErrorReport,
+                symbols: SymbolTable = None) -> Iterator[Token]:
+    '''
+    Cook raw tokens lazily, yielding cooked tokens one by one.
+    Each token goes straight to the cooker of its raw token type.
+    Names and operators are interned into `symbols`, or into a table of
+    their own if none is given.
+    Stops early once the error budget of the report is exhausted.
+    '''
+    cookers = RAW_TYPE_TO_COOKER
+    if symbols is None:
+        symbols = SymbolTable()
+    for token in tokens:
+        if error_report.exhausted():
+            error_report.stop(token.span)
+            return
+        yield make_token(token, cookers[token.kind.token_type](
+            token, error_report, symbols))
+
+
+def iter_cooked_in_place(tokens: Iterable[Token], error_report: ErrorReport,
+                         symbols: SymbolTable = None) -> Iterator[Token]:
+    '''
+    Cook raw tokens in a single pass, leaving whitespace and comments raw.
+
+    Reports the same errors as `iter_cooked`, but whitespace is not cooked
+    at all and every other token is reused with its kind replaced by the
+    cooked one instead of being copied, so it must not be shared with
+    anything else. The trivia is meant to be attached to the significant
+    tokens with `trivia.attach_trivia`.
+    '''
+    cookers = RAW_TYPE_TO_COOKER
+    whitespace = raw_token.RawTokenType.WHITESPACE
+    comment = raw_token.RawTokenType.COMMENT
+    if symbols is None:
+        symbols = SymbolTable()
+    for token in tokens:
+        if error_report.exhausted():
+            error_report.stop(token.span)
+            return
+        token_type = token.kind.token_type
+        if token_type is not whitespace:
+            kind = cookers[token_type](token, error_report, symbols)
+            if token_type is not comment:
+                token.kind = kind
+        yield token
+
+
+def iter_significant(tokens: Iterable[Token]) -> Iterator[Token]:
+    '''
+    Drop whitespace and comments from cooked tokens.
+    '''
+    comment, whitespace = Comment(), Whitespace()
     for token in tokens:
-        for kind, cooker in kind_to_cooker:
-            if token.kind.extends(kind):
-                cooked.append(cooker(token, error_report))
-                break
-    return cooked
+        if not token.kind.extends(comment) \
+                and not token.kind.extends(whitespace):
+            yield token
 
 
 def make_token(raw_token: Token, new_kind: TokenKind):
-    return Token(raw_token.span, new_kind, raw_token.text)
+    return raw_token.with_kind(new_kind)
 
 
-def cook_whitespace(token: Token, error_report: ErrorReport) -> Token:
-    return make_token(token, Whitespace())
+def cook_whitespace(token: Token, error_report: ErrorReport,
+                    symbols: SymbolTable) -> TokenKind:
+    return Whitespace()
 
 
-def cook_comment(token: Token, error_report: ErrorReport) -> Token:
+def cook_comment(token: Token, error_report: ErrorReport,
+                 symbols: SymbolTable) -> TokenKind:
     if not token.kind.terminated:
         error_report.add(unterminated_comment(token))
-    return make_token(token, Comment())
+    return Comment()
 
 
-def cook_literal(token: Token, error_report: ErrorReport) -> Token:
+def cook_literal(token: Token, error_report: ErrorReport,
+                 symbols: SymbolTable) -> TokenKind:
     if token.kind.literal_type == lex.LiteralType.NUMBER:
         return cook_number(token, error_report)
     else:
@@ -77,11 +127,19 @@ TEXT_TO_SUFFIX = {
 }
 
 
-def cook_number(token: Token, error_report: ErrorReport) -> Token:
+# Number of distinct literal values whose cooked kinds are reused
+LITERAL_CACHE_SIZE = 4096
+
+
+def cook_number(token: Token, error_report: ErrorReport) -> TokenKind:
+    text = token.text
+    if token.kind.base == 10 and text.isascii() and text.isdigit():
+        return decimal_integer(text)
+
     _, _, suffix = split_number(token)
     if suffix and suffix not in TEXT_TO_SUFFIX:
         error_report.add(invalid_number_suffix(token, suffix))
-        return make_token(token, Invalid())
+        return Invalid()
 
     if token.text.count('.') > 0 or is_float_suffix(suffix):
         return cook_float(token, error_report)
@@ -93,58 +151,71 @@ def is_float_suffix(suffix: str) -> bool:
     return suffix == 'f'
 
 
+@lru_cache(maxsize=LITERAL_CACHE_SIZE)
+def decimal_integer(text: str) -> TokenKind:
+    '''
+    Kind of a plain decimal integer literal, shared by equal literals
+    '''
+    return Integer(10, int(text), None)
+
+
+BASE_TO_NUMBER = {
+    base: re.compile(f'[.{digits}]*') for base, digits in BASE_TO_DIGITS.items()
+}
+
+
 def split_number(token: Token) -> Tuple[str, str, str]:
+    text = token.text
     if token.kind.base != 10:
-        prefix = token.text[:2]
-        text = token.text[2:]
+        prefix = text[:2]
+        text = text[2:]
     else:
         prefix = ''
-        text = token.text
 
-    digits = BASE_TO_DIGITS[token.kind.base]
-    number = ''
-    for c in text:
-        if c == '.' or c in digits:
-            number += c
-        else:
-            break
-    suffix = text[len(number):]
-    return prefix, number, suffix
+    end = BASE_TO_NUMBER[token.kind.base].match(text).end()
+    return prefix, text[:end], text[end:]
 
 
-def cook_float(token: Token, error_report: ErrorReport) -> Token:
+def cook_float(token: Token, error_report: ErrorReport) -> TokenKind:
     dots = token.text.count('.')
     if dots > 1:
         error_report.add(invalid_float_literal(token))
-        return make_token(token, Invalid())
+        return Invalid()
     elif token.kind.base != 10:
         error_report.add(BASE_TO_FLOAT_ERROR[token.kind.base](token))
-        return make_token(token, Invalid())
+        return Invalid()
     else:
         _, number, suffix = split_number(token)
         suffix = TEXT_TO_SUFFIX[suffix]
-        return make_token(token, Float(float(number), suffix))
+        return Float(float(number), suffix)
 
 
-def cook_integer(token: Token, error_report: ErrorReport) -> Token:
+def cook_integer(token: Token, error_report: ErrorReport) -> TokenKind:
     _, number, suffix = split_number(token)
     base = token.kind.base
     if not number:
         error_report.add(number_without_digits(token))
-        return make_token(token, Invalid())
+        return Invalid()
     else:
         suffix = TEXT_TO_SUFFIX[suffix]
-        return make_token(token, Integer(base, int(number, base), suffix))
+        return Integer(base, int(number, base), suffix)
 
 
-def cook_string(token: Token, error_report: ErrorReport) -> Token:
+def cook_string(token: Token, error_report: ErrorReport) -> TokenKind:
     if not token.kind.terminated:
         error_report.add(unterminated_string(token))
         content = token.text[1:]
     else:
         content = token.text[1:-1]
-    content = unescape(content)
-    return make_token(token, String(content))
+    return string_literal(content)
+
+
+@lru_cache(maxsize=LITERAL_CACHE_SIZE)
+def string_literal(content: str) -> TokenKind:
+    '''
+    Kind of a string literal, shared by equal literals
+    '''
+    return String(unescape(content))
 
 
 ESCAPES = {
@@ -156,17 +227,13 @@ ESCAPES = {
 }
 
 
+ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+
+
 def unescape(text: str) -> str:
-    result = ''
-    i = 0
-    while i < len(text):
-        if text[i] == '\\' and i + 1 < len(text) and text[i + 1] in ESCAPES:
-            result += ESCAPES[text[i + 1]]
-            i += 2
-        else:
-            result += text[i]
-            i += 1
-    return result
+    if '\\' not in text:
+        return text
+    return ESCAPE.sub(lambda m: ESCAPES.get(m.group(1), m.group()), text)
 
 
 KEYWORDS = {
@@ -197,15 +264,23 @@ BOOLS = {
 }
 
 
-def cook_name(token: Token, error_report: ErrorReport) -> Token:
-    if token.text in KEYWORDS:
-        return make_token(token, Keyword(KEYWORDS[token.text]))
-    elif token.text in BOOLS:
-        return make_token(token, Bool(BOOLS[token.text]))
-    elif token.text[0].isupper():
-        return make_token(token, Type())
+NAME_TO_KIND = {
+    **{text: Keyword(keyword_type) for text, keyword_type in KEYWORDS.items()},
+    **{text: Bool(bool_value) for text, bool_value in BOOLS.items()},
+}
+
+
+def cook_name(token: Token, error_report: ErrorReport,
+              symbols: SymbolTable) -> TokenKind:
+    text = token.text
+    kind = NAME_TO_KIND.get(text)
+    if kind is not None:
+        return kind
+    token.symbol = symbols.intern(text)
+    if text[0].isupper():
+        return Type()
     else:
-        return make_token(token, Identifier())
+        return Identifier()
 
 
 PARENS = {
@@ -218,9 +293,14 @@ PARENS = {
 }
 
 
-def cook_delimiter(token: Token, error_report: ErrorReport) -> Token:
-    Kind, delimiter_type = PARENS[token.text]
-    return make_token(token, Kind(delimiter_type))
+DELIMITER_TO_KIND = {
+    text: Kind(delimiter_type) for text, (Kind, delimiter_type) in PARENS.items()
+}
+
+
+def cook_delimiter(token: Token, error_report: ErrorReport,
+                   symbols: SymbolTable) -> TokenKind:
+    return DELIMITER_TO_KIND[token.text]
 
 
 SYMBOLS = {
@@ -233,13 +313,35 @@ SYMBOLS = {
 }
 
 
-def cook_operator_or_symbol(token: Token, error_report: ErrorReport) -> Token:
-    if token.text in SYMBOLS:
-        return make_token(token, Symbol(SYMBOLS[token.text]))
-    else:
-        return make_token(token, Operator())
+SYMBOL_TO_KIND = {
+    text: Symbol(symbol_type) for text, symbol_type in SYMBOLS.items()
+}
+
 
+def cook_operator_or_symbol(token: Token, error_report: ErrorReport,
+                            symbols: SymbolTable) -> TokenKind:
+    text = token.text
+    kind = SYMBOL_TO_KIND.get(text)
+    if kind is not None:
+        return kind
+    token.symbol = symbols.intern(text)
+    return Operator()
 
-def cook_unknown(token: Token, error_report: ErrorReport) -> Token:
+
+def cook_unknown(token: Token, error_report: ErrorReport,
+                 symbols: SymbolTable) -> TokenKind:
     error_report.add(unknown_token(token))
-    return make_token(token, Unknown())
+    return Unknown()
+
+
+RAW_TYPE_TO_COOKER = {
+    raw_token.RawTokenType.WHITESPACE: cook_whitespace,
+    raw_token.RawTokenType.COMMENT: cook_comment,
+    raw_token.RawTokenType.LITERAL: cook_literal,
+    raw_token.RawTokenType.NAME: cook_name,
+    raw_token.RawTokenType.DELIMITER: cook_delimiter,
+    raw_token.RawTokenType.OPERATOR: cook_operator_or_symbol,
+    raw_token.RawTokenType.SYMBOL: cook_operator_or_symbol,
+    raw_token.RawTokenType.UNKNOWN: cook_unknown,
+}
+
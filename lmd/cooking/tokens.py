@@ -135,6 +135,8 @@ class NumericalSuffix(Enum):
 
 
 class Integer(Number):
+    payload_attrs = ('base', 'int_value', 'suffix')
+
     def __init__(self, base: int, int_value: int, suffix: NumericalSuffix = None):
         super().__init__(NumberType.INT)
         self.base = base
@@ -146,6 +148,8 @@ class Integer(Number):
 
 
 class Float(Number):
+    payload_attrs = ('float_value', 'suffix')
+
     def __init__(self, float_value: float, suffix: NumericalSuffix = None):
         super().__init__(NumberType.FLOAT)
         self.float_value = float_value
@@ -156,6 +160,8 @@ class Float(Number):
 
 
 class String(Literal):
+    payload_attrs = ('content',)
+
     def __init__(self, content: str):
         super().__init__(LiteralType.STRING)
         self.content = content
@@ -0,0 +1,96 @@
+'''
+Whitespace and comments attached to significant tokens as trivia.
+
+Instead of flowing through the parser as tokens, each run of whitespace and
+comments between two significant tokens is split in two. The part up to and
+including the first line break is the trailing trivia of the token before
+it, the rest is the leading trivia of the token after it. A comment that
+spans a line break goes to the token after it. Trivia at the end of the
+source trails the last token.
+
+Only the offsets are stored on the tokens. The trivia tokens themselves are
+recovered by lexing the trivia spans again.
+'''
+
+from typing import Iterable, Iterator, List
+
+from lmd.util.source import *
+from lmd.util.token import Token
+from lmd.lexing import raw_token, pattern_lex
+from lmd.cooking import tokens as cooked_token
+
+
+# Raw and cooked token types of whitespace and comments
+TRIVIA_TYPES = {
+    raw_token.RawTokenType.WHITESPACE,
+    raw_token.RawTokenType.COMMENT,
+    cooked_token.TokenType.WHITESPACE,
+    cooked_token.TokenType.COMMENT,
+}
+
+
+def attach_trivia(tokens: Iterable[Token]) -> Iterator[Token]:
+    '''
+    Drop whitespace and comments, attaching them to the significant tokens.
+    Each significant token is yielded once the trivia after it is known.
+    '''
+    previous = None
+    trivia = []
+    for token in tokens:
+        if token.kind.token_type in TRIVIA_TYPES:
+            trivia.append(token)
+            continue
+
+        if previous is None:
+            token.leading_begin = trivia[0].span.begin if trivia else token.span.begin
+        else:
+            split = trailing_split(trivia, token.span.begin)
+            previous.trailing_end = split
+            token.leading_begin = split
+            yield previous
+        previous = token
+        trivia = []
+
+    if previous is not None:
+        previous.trailing_end = trivia[-1].span.end if trivia else previous.span.end
+        yield previous
+
+
+def trailing_split(trivia: List[Token], end: int) -> int:
+    '''
+    Offset at which a run of trivia ending at `end` stops trailing the
+    token before it
+    '''
+    for token in trivia:
+        text = token.text
+        line_break = text.find('\n')
+        if line_break == -1:
+            continue
+        if text.isspace():
+            return token.span.begin + line_break + 1
+        return token.span.begin
+    return end
+
+
+def lex_trivia(span: Span, lexer=pattern_lex) -> List[Token]:
+    '''
+    Recover the raw whitespace and comment tokens in a trivia span
+    '''
+    result = []
+    if span.begin == span.end:
+        return result
+    for token in lexer.iter_source(span.source, span.begin):
+        if token.span.begin >= span.end:
+            break
+        if token.span.end > span.end:
+            token = Token(Span(span.source, token.span.begin, span.end), token.kind)
+        result.append(token)
+    return result
+
+
+def leading_trivia(token: Token, lexer=pattern_lex) -> List[Token]:
+    return lex_trivia(token.leading_trivia(), lexer)
+
+
+def trailing_trivia(token: Token, lexer=pattern_lex) -> List[Token]:
+    return lex_trivia(token.trailing_trivia(), lexer)
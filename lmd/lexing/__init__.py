@@ -1,3 +1,5 @@
 from . import raw_token
 from . import cursor
 from . import lex
+from . import pattern_lex
+from . import incremental
@@ -0,0 +1,204 @@
+'''
+Character classes used by the lexers.
+
+Every ASCII character has a precomputed set of class flags, other characters
+fall back to `str.isalpha` for names. Run scanners skip a whole run of
+characters of one class and return the end index instead of the text.
+In `str` text, runs of non-ASCII characters are matched and checked whole.
+Scanners accept both `str` and UTF-8 encoded bytes; for bytes the indices
+are byte offsets and only non-ASCII characters are decoded.
+'''
+
+import re
+import string
+
+from typing import Tuple
+
+
+SPACE = 1 << 0
+DIGIT = 1 << 1
+NAME_START = 1 << 2
+NAME_CONTINUE = 1 << 3
+NUMBER = 1 << 4
+OPERATOR = 1 << 5
+DELIMITER = 1 << 6
+STRUCTURAL = 1 << 7
+
+SYMBOL = OPERATOR | DELIMITER | STRUCTURAL
+
+SPACE_CHARACTERS = " \t\r\n"
+DIGIT_CHARACTERS = string.digits
+NAME_START_CHARACTERS = string.ascii_letters + "_'"
+NAME_CONTINUE_CHARACTERS = NAME_START_CHARACTERS + DIGIT_CHARACTERS
+NUMBER_CHARACTERS = "_" + string.digits + string.ascii_letters
+
+DELIMITERS = "()[]{}"
+STRUCTURAL_SYMBOLS = ":,;"
+
+MATH_SYMBOLS = "+-*/%&|^~"
+COMPARISON_SYMBOLS = "<=>"
+MISC_SYMBOLS = "$."
+OPERATOR_SYMBOLS = MATH_SYMBOLS + COMPARISON_SYMBOLS + MISC_SYMBOLS
+
+CLASS_TO_CHARACTERS = {
+    SPACE: SPACE_CHARACTERS,
+    DIGIT: DIGIT_CHARACTERS,
+    NAME_START: NAME_START_CHARACTERS,
+    NAME_CONTINUE: NAME_CONTINUE_CHARACTERS,
+    NUMBER: NUMBER_CHARACTERS,
+    OPERATOR: OPERATOR_SYMBOLS,
+    DELIMITER: DELIMITERS,
+    STRUCTURAL: STRUCTURAL_SYMBOLS,
+}
+
+# Classes that non-ASCII letters belong to
+UNICODE_LETTER = NAME_START | NAME_CONTINUE
+
+
+def ascii_classes():
+    classes = [0] * 128
+    for char_class, characters in CLASS_TO_CHARACTERS.items():
+        for c in characters:
+            classes[ord(c)] |= char_class
+    return classes
+
+
+ASCII_CLASSES = ascii_classes()
+
+
+def classes_of(c: str) -> int:
+    '''
+    Class flags of a single character
+    '''
+    code = ord(c)
+    if code < 128:
+        return ASCII_CLASSES[code]
+    elif c.isalpha():
+        return UNICODE_LETTER
+    else:
+        return 0
+
+
+def is_in(c: str, char_class: int) -> bool:
+    return classes_of(c) & char_class != 0
+
+
+def ascii_run_pattern(char_class: int):
+    characters = ''.join(
+        chr(code) for code in range(128) if ASCII_CLASSES[code] & char_class)
+    return re.compile(f'[{re.escape(characters)}]*')
+
+
+ASCII_RUNS = {
+    char_class: ascii_run_pattern(char_class)
+    for char_class in [*CLASS_TO_CHARACTERS, SYMBOL]
+}
+
+ASCII_BYTE_RUNS = {
+    char_class: re.compile(pattern.pattern.encode())
+    for char_class, pattern in ASCII_RUNS.items()
+}
+
+
+def letter_run_patterns(char_class: int):
+    '''
+    Pattern matching a run of the ASCII characters of a class and any
+    non-ASCII characters, and one matching its ASCII characters that are
+    not letters
+    '''
+    characters = ''.join(
+        chr(code) for code in range(128) if ASCII_CLASSES[code] & char_class)
+    non_letters = ''.join(c for c in characters if not c.isalpha())
+    return (re.compile(f'[{re.escape(characters)}\u0080-\U0010ffff]*'),
+            re.compile(f'[{re.escape(non_letters)}]+'))
+
+
+LETTER_RUNS = {
+    char_class: letter_run_patterns(char_class)
+    for char_class in CLASS_TO_CHARACTERS if char_class & UNICODE_LETTER
+}
+
+
+def utf8_width(lead: int) -> int:
+    '''
+    Length of the UTF-8 sequence starting with byte `lead`
+    '''
+    if lead < 0x80:
+        return 1
+    elif lead < 0xE0:
+        return 2
+    elif lead < 0xF0:
+        return 3
+    else:
+        return 4
+
+
+def char_at(text, index: int) -> Tuple[str, int]:
+    '''
+    Character starting at `index` and the index after it.
+    Invalid UTF-8 is read as one replacement character per byte.
+    '''
+    if isinstance(text, str):
+        return text[index], index + 1
+    end = index + utf8_width(text[index])
+    try:
+        return bytes(text[index:end]).decode('utf-8'), end
+    except UnicodeDecodeError:
+        return '\ufffd', index + 1
+
+
+def scan(text, index: int, char_class: int) -> int:
+    '''
+    Index after the run of `char_class` characters starting at `index`
+    '''
+    if isinstance(text, str):
+        return scan_str(text, index, char_class)
+    ascii_run = ASCII_BYTE_RUNS[char_class].match
+    length = len(text)
+    while True:
+        index = ascii_run(text, index).end()
+        if index < length and char_class & UNICODE_LETTER \
+                and not text[index:index + 1].isascii():
+            c, end = char_at(text, index)
+            if c.isalpha():
+                index = end
+                continue
+        return index
+
+
+def scan_str(text: str, index: int, char_class: int) -> int:
+    '''
+    `scan` for `str` text. A run with non-ASCII characters is matched whole
+    and taken if they are all letters.
+    '''
+    ascii_run = ASCII_RUNS[char_class].match
+    if not char_class & UNICODE_LETTER:
+        return ascii_run(text, index).end()
+    letter_run, non_letters = LETTER_RUNS[char_class]
+    match = letter_run.match(text, index)
+    run = match.group()
+    if run.isascii() or non_letters.sub('', run).isalpha():
+        return match.end()
+    # Some non-ASCII character of the run is not a letter
+    while True:
+        index = ascii_run(text, index).end()
+        c = text[index:index + 1]
+        if c.isascii() or not c.isalpha():
+            return index
+        index += 1
+
+
+def scan_number(text, index: int) -> int:
+    '''
+    Index after the digits of a number starting at `index`.
+    A dot is part of the number only if a number character follows it.
+    '''
+    dot = '.' if isinstance(text, str) else b'.'
+    while True:
+        index = scan(text, index, NUMBER)
+        if text[index:index + 1] != dot:
+            return index
+        end = scan(text, index + 1, NUMBER)
+        if end == index + 1:
+            return index
+        index = end
@@ -1,4 +1,5 @@
 from lmd.util.source import *
+from lmd.lexing.chars import scan
 
 
 class Cursor:
@@ -25,14 +26,32 @@ class Cursor:
         self.index += cnt
         return result
 
+    def skip(self, cnt: int = 1):
+        '''
+        Skip the next `cnt` characters
+        '''
+        self.index += cnt
+
+    def skip_while(self, predicate):
+        '''
+        Skip characters while `predicate` returns true
+        '''
+        while self.has() and predicate(self.peek()):
+            self.index += 1
+
+    def skip_class(self, char_class: int):
+        '''
+        Skip the run of characters of `char_class`
+        '''
+        self.index = scan(self.src.text, self.index, char_class)
+
     def take_while(self, predicate) -> str:
         '''
         Take characters while `predicate` returns true
         '''
-        result = ""
-        while self.has() and predicate(self.peek()):
-            result += self.take()
-        return result
+        begin = self.index
+        self.skip_while(predicate)
+        return self.src.text[begin:self.index]
 
     def has(self, cnt: int = 1) -> bool:
         '''
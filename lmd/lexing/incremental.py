@@ -0,0 +1,274 @@
+'''
+Re-lex a source after a local edit, reusing the tokens the edit cannot affect.
+
+Lexing is context free at token boundaries: a lexer started at a boundary
+produces the same tokens whatever precedes it. The lexers look at most two
+characters past the end of a token, so tokens ending well before the edit
+are kept as they are. Lexing restarts at the first token the edit could
+affect. It stops as soon as a new token begins where an old token began
+behind the edit, because the rest of the text is identical from there.
+
+The source is edited in place, so the tokens before the edit stay valid as
+they are. The tokens behind it are kept together with the offset they have
+moved by and are shifted only when read. An edit costs only the damaged
+region instead of the file size.
+'''
+
+import bisect
+
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+
+from lmd.util.source import *
+from lmd.util.token import Token
+from lmd.lexing import pattern_lex
+
+
+# Characters past the end of a token that the lexers may look at
+LOOKAHEAD = 2
+
+# Tokens per chunk of `Tokens`
+CHUNK = 64
+
+
+@dataclass
+class Edit:
+    '''
+    Replace `begin:end` of the old source with `text`
+    '''
+    begin: int
+    end: int
+    text: str
+
+    def apply(self, src: Source):
+        src.replace(self.begin, self.end, self.text)
+
+    def delta(self) -> int:
+        return len(self.text) - (self.end - self.begin)
+
+
+class Tokens:
+    '''
+    Tokens of a source that is edited in place.
+
+    Tokens are stored in chunks of about `CHUNK` tokens, none of them empty
+    unless there are no tokens. The tokens of a chunk have all moved by the
+    same offset since they were stored and are shifted by it when read.
+    Chunk sizes and offsets are kept in Fenwick trees, so an edit rewrites
+    only the chunks it touches and its cost does not grow with the file or
+    with the number of earlier edits.
+    '''
+
+    def __init__(self, tokens: Iterable[Token]):
+        tokens = list(tokens)
+        chunks = [tokens[i:i + CHUNK] for i in range(0, len(tokens), CHUNK)]
+        self.rebuild(chunks, [0] * len(chunks))
+
+    def rebuild(self, chunks: List[List[Token]], offsets: List[int]):
+        '''
+        Store `chunks` shifted by `offsets`, dropping the empty ones
+        '''
+        kept = [(chunk, offset) for chunk, offset in zip(chunks, offsets)
+                if chunk] or [([], 0)]
+        self.chunks = [chunk for chunk, _ in kept]
+        offsets = [offset for _, offset in kept]
+        self.sizes = fenwick([len(chunk) for chunk in self.chunks])
+        self.shifts = fenwick(
+            [offsets[0]] + [b - a for a, b in zip(offsets, offsets[1:])])
+        self.length = sum(map(len, self.chunks))
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('token index out of range')
+        chunk, index = self.locate(index)
+        offset = self.offset(chunk)
+        token = self.chunks[chunk][index]
+        return token if offset == 0 else moved(token, offset)
+
+    def __iter__(self):
+        for number, chunk in enumerate(self.chunks):
+            offset = self.offset(number)
+            if offset == 0:
+                yield from chunk
+            else:
+                for token in chunk:
+                    yield moved(token, offset)
+
+    def locate(self, index: int) -> Tuple[int, int]:
+        '''
+        The chunk holding the token at `index` and its index in the chunk.
+        One past the last token is located at the end of the last chunk.
+        '''
+        chunk, index = fenwick_search(self.sizes, index)
+        if chunk == len(self.chunks):
+            chunk -= 1
+            index += len(self.chunks[chunk])
+        return chunk, index
+
+    def offset(self, chunk: int) -> int:
+        return fenwick_sum(self.shifts, chunk + 1)
+
+    def find(self, position: int, key) -> int:
+        '''
+        Index of the first token whose span has `key` at least `position`
+        '''
+        if self.length == 0:
+            return 0
+        chunks = self.chunks
+        chunk = bisect.bisect_left(
+            range(len(chunks)), position,
+            key=lambda i: key(chunks[i][-1].span) + self.offset(i))
+        if chunk == len(chunks):
+            return self.length
+        index = bisect.bisect_left(
+            chunks[chunk], position - self.offset(chunk),
+            key=lambda token: key(token.span))
+        return fenwick_sum(self.sizes, chunk) + index
+
+    def replace(self, first: int, old: int, tokens: List[Token], delta: int):
+        '''
+        Replace the tokens `first:old` with `tokens` and move the tokens
+        behind them by `delta`
+        '''
+        chunk, begin = self.locate(first)
+        if old > first:
+            last, end = self.locate(old - 1)
+            end += 1
+        else:
+            last, end = chunk, begin
+
+        offset = self.offset(chunk)
+        tail_offset = self.offset(last) + delta
+        head = self.chunks[chunk][:begin]
+        tail = self.chunks[last][end:]
+        # The merged chunk keeps the offset of its longer side
+        merged_offset = offset if len(head) >= len(tail) else tail_offset
+        merged = shifted(head, offset - merged_offset) \
+            + shifted(tokens, -merged_offset) \
+            + shifted(tail, tail_offset - merged_offset)
+        self.length += len(tokens) - (old - first)
+
+        count = last - chunk + 1
+        if not count <= len(merged) <= 2 * CHUNK * count:
+            offsets = [self.offset(i) for i in range(len(self.chunks))]
+            pieces = [merged[i:i + CHUNK] for i in range(0, len(merged), CHUNK)]
+            self.rebuild(
+                self.chunks[:chunk] + pieces + self.chunks[last + 1:],
+                offsets[:chunk] + [merged_offset] * len(pieces)
+                + [offset + delta for offset in offsets[last + 1:]])
+            return
+
+        # The merged tokens are spread over the chunks they came from
+        offsets = [self.offset(i) for i in range(chunk, last + 1)]
+        for number in range(count):
+            i = chunk + number
+            piece = merged[len(merged) * number // count:
+                           len(merged) * (number + 1) // count]
+            fenwick_add(self.sizes, i, len(piece) - len(self.chunks[i]))
+            self.chunks[i] = piece
+            fenwick_add(self.shifts, i, merged_offset - offsets[number])
+            if i + 1 < len(self.chunks):
+                fenwick_add(self.shifts, i + 1, offsets[number] - merged_offset)
+        if last + 1 < len(self.chunks):
+            fenwick_add(self.shifts, last + 1, delta)
+
+
+def relex(tokens: List[Token], src: Source, edit: Edit,
+          lexer=pattern_lex) -> Tuple[Source, Tokens]:
+    '''
+    Apply `edit` to `src` in place and update `tokens`, produced by lexing
+    `src` or by an earlier relex, to match. Returns the source and its
+    tokens. A list of tokens is also rewritten to the new tokens, which
+    takes time proportional to its length, so later edits should be given
+    the returned `Tokens` instead.
+    '''
+    if not 0 <= edit.begin <= edit.end <= src.len():
+        raise ValueError(f"Edit out of range: {edit}")
+    result = tokens if isinstance(tokens, Tokens) else Tokens(tokens)
+
+    delta = edit.delta()
+    edited_end = edit.begin + len(edit.text)
+
+    first = result.find(edit.begin - LOOKAHEAD + 1, lambda span: span.end)
+    restart = result[first].span.begin if first < len(result) else src.len()
+    old = result.find(edit.end, lambda span: span.begin)
+    edit.apply(src)
+
+    relexed = []
+    for token in lexer.iter_source(src, restart):
+        if token.span.begin >= edited_end:
+            old_begin = token.span.begin - delta
+            while old < len(result) and result[old].span.begin < old_begin:
+                old += 1
+            if old < len(result) and result[old].span.begin == old_begin:
+                break
+        relexed.append(token)
+    else:
+        old = len(result)
+
+    result.replace(first, old, relexed, delta)
+    if result is not tokens:
+        tokens[:] = result
+    return src, result
+
+
+def moved(token: Token, delta: int) -> Token:
+    '''
+    The same token shifted by `delta` characters
+    '''
+    span = token.span
+    return Token(Span(span.source, span.begin + delta, span.end + delta), token.kind)
+
+
+def shifted(tokens: List[Token], delta: int) -> List[Token]:
+    return tokens if delta == 0 else [moved(token, delta) for token in tokens]
+
+
+def fenwick(values: List[int]) -> List[int]:
+    '''
+    Fenwick tree of `values`, indexed from 1
+    '''
+    tree = [0] + values
+    for i in range(1, len(tree)):
+        parent = i + (i & -i)
+        if parent < len(tree):
+            tree[parent] += tree[i]
+    return tree
+
+
+def fenwick_add(tree: List[int], index: int, value: int):
+    index += 1
+    while index < len(tree):
+        tree[index] += value
+        index += index & -index
+
+
+def fenwick_sum(tree: List[int], count: int) -> int:
+    '''
+    Sum of the first `count` values
+    '''
+    total = 0
+    while count > 0:
+        total += tree[count]
+        count -= count & -count
+    return total
+
+
+def fenwick_search(tree: List[int], target: int) -> Tuple[int, int]:
+    '''
+    The most values, all non-negative, whose sum is at most `target`,
+    and what remains of `target` past them
+    '''
+    position = 0
+    step = 1 << (len(tree) - 1).bit_length()
+    while step:
+        if position + step < len(tree) and tree[position + step] <= target:
+            position += step
+            target -= tree[position]
+        step >>= 1
+    return position, target
@@ -1,19 +1,33 @@
 '''
 Split source code into raw tokens.
 This is the first step before actual parsing, no errors are reported here.
+Lexing only stops early once the error budget of a report is exhausted.
 '''
 
-import string
+import re
+
+from typing import Tuple
 
 from lmd.util.source import *
+from lmd.util.error import ErrorReport
 from lmd.lexing.cursor import Cursor
 from lmd.lexing.raw_token import *
+from lmd.lexing.chars import *
 
 
-def lex_source(src: Source) -> list:
+def lex_source(src: Source, error_report: ErrorReport = None) -> list:
     '''
     Lex a source in to a list of raw tokens.
     '''
+    return list(iter_source(src, 0, error_report))
+
+
+def iter_source(src: Source, index: int = 0, error_report: ErrorReport = None):
+    '''
+    Lex a source lazily, yielding raw tokens one by one.
+    Lexing starts at `index`, which must be a token boundary.
+    Stops early once the error budget of the report, if any, is exhausted.
+    '''
 
     # predicate: (lookahead, lexer)
     predicate_to_lexer = {
@@ -25,32 +39,35 @@ def lex_source(src: Source) -> list:
         is_string_start: (1, lex_string),
     }
 
-    result = []
-    cursor = Cursor(src)
+    exhausted = None if error_report is None else error_report.exhausted
+    cursor = Cursor(src, index)
     while cursor.has():
         for predicate, (lookahead, lexer) in predicate_to_lexer.items():
             if predicate(cursor.peek(lookahead)):
-                result.append(lexer(cursor))
+                token = lexer(cursor)
                 break
         else:
-            result.append(lex_unknown(cursor))
-    return result
+            token = lex_unknown(cursor)
+        if exhausted is not None and exhausted():
+            error_report.stop(token.span)
+            return
+        yield token
 
 
 def is_space(s: str) -> bool:
-    return s in " \t\r\n"
+    return is_in(s, SPACE)
 
 
 def is_digit(s: str) -> bool:
-    return s in "0123456789"
+    return is_in(s, DIGIT)
 
 
 def is_name_start(s: str) -> bool:
-    return s.isalpha() or s == "_" or s == '\''
+    return is_in(s, NAME_START)
 
 
 def is_name_continue(s: str) -> bool:
-    return is_name_start(s) or is_digit(s)
+    return is_in(s, NAME_CONTINUE)
 
 
 def is_string_start(s: str) -> bool:
@@ -65,10 +82,8 @@ def lex_whitespace(cursor: Cursor) -> Token:
     '''
     Lex whitespace
     '''
-    text = ""
-    while cursor.has() and is_space(cursor.peek()):
-        text += cursor.take()
-    return Token(cursor.consume_span(), Whitespace(), text)
+    cursor.skip_class(SPACE)
+    return Token(cursor.consume_span(), Whitespace())
 
 
 def lex_comment(cursor: Cursor) -> Token:
@@ -85,34 +100,52 @@ def lex_line_comment(cursor: Cursor) -> Token:
     '''
     Lex a line comment
     '''
-    text = cursor.take_while(lambda s: s != "\n")
+    cursor.index = scan_line_comment(cursor.src.text, cursor.index)
     span = cursor.consume_span()
-    return Token(span, LineComment(), text)
+    return Token(span, LineComment())
 
 
 def lex_block_comment(cursor: Cursor) -> Token:
     '''
     Lex a block comment
     '''
-    text = ""
-    depth = 0
-    terminated = False
+    cursor.index, terminated = scan_block_comment(cursor.src.text, cursor.index)
+    span = cursor.consume_span()
+    return Token(span, BlockComment(terminated))
 
-    while cursor.has():
-        if cursor.peek(2) == "{-":
+
+def scan_line_comment(text: str, index: int) -> int:
+    '''
+    Index of the end of the line comment starting at `index`
+    '''
+    end = text.find("\n", index)
+    return len(text) if end == -1 else end
+
+
+BLOCK_COMMENT_DELIMITER = re.compile(r'(?P<open>\{-)|-\}')
+BYTES_BLOCK_COMMENT_DELIMITER = re.compile(
+    BLOCK_COMMENT_DELIMITER.pattern.encode())
+
+
+def scan_block_comment(text, index: int) -> Tuple[int, bool]:
+    '''
+    Find the end of a (possibly nested) block comment starting at `index`,
+    jumping from one comment delimiter to the next.
+    Returns the end index and whether the comment is terminated.
+    '''
+    if isinstance(text, str):
+        delimiters = BLOCK_COMMENT_DELIMITER.finditer(text, index)
+    else:
+        delimiters = BYTES_BLOCK_COMMENT_DELIMITER.finditer(text, index)
+    depth = 0
+    for m in delimiters:
+        if m.lastgroup == "open":
             depth += 1
-            text += cursor.take(2)
-        elif cursor.peek(2) == "-}":
+        else:
             depth -= 1
-            text += cursor.take(2)
             if depth == 0:
-                terminated = True
-                break
-        else:
-            text += cursor.take()
-
-    span = cursor.consume_span()
-    return Token(span, BlockComment(terminated), text)
+                return m.end(), True
+    return len(text), False
 
 
 PREFIX_TO_BASE = {
@@ -121,73 +154,43 @@ PREFIX_TO_BASE = {
     "0x": 16,
 }
 
-NUMBER_CHARACTERS = "_" + string.digits + \
-    string.ascii_lowercase + string.ascii_uppercase
-
 
 def lex_number(cursor: Cursor) -> Token:
     '''
     Lex a number
     '''
-
-    def should_take(cursor: Cursor) -> bool:
-        if not cursor.has():
-            return False
-        elif cursor.peek() in NUMBER_CHARACTERS:
-            return True
-        elif cursor.peek() == ".":
-            if cursor.has(2):
-                return cursor.peek(2)[1] in NUMBER_CHARACTERS
-            else:
-                return False
-        else:
-            return False
-
-    text = ""
     prefix = cursor.peek(2)
     if prefix in PREFIX_TO_BASE:
         base = PREFIX_TO_BASE[prefix]
-        text += cursor.take(2)
+        cursor.skip(2)
     else:
         base = 10
 
-    while should_take(cursor):
-        text += cursor.take()
+    cursor.index = scan_number(cursor.src.text, cursor.index)
 
     span = cursor.consume_span()
-    return Token(span, Number(base), text)
+    return Token(span, Number(base))
 
 
 def lex_name(cursor: Cursor) -> Token:
     '''
     Lex a name
     '''
-    text = cursor.take_while(is_name_continue)
+    cursor.skip_class(NAME_CONTINUE)
     span = cursor.consume_span()
-    return Token(span, Name(), text)
-
-
-DELIMITERS = "()[]{}"
-STRUCTURAL_SYMBOLS = ":,;"
-
-MATH_SYMBOLS = "+-*/%&|^~"
-COMPARISON_SYMBOLS = "<=>"
-MISC_SYMBOLS = "$."
-OPERATOR_SYMBOLS = MATH_SYMBOLS + COMPARISON_SYMBOLS + MISC_SYMBOLS
-
-SYMBOLS = DELIMITERS + STRUCTURAL_SYMBOLS + OPERATOR_SYMBOLS
+    return Token(span, Name())
 
 
 def is_delimiter(s: str) -> bool:
-    return s in DELIMITERS
+    return is_in(s, DELIMITER)
 
 
 def is_operator(s: str) -> bool:
-    return s in OPERATOR_SYMBOLS
+    return is_in(s, OPERATOR)
 
 
 def is_symbol(s: str) -> bool:
-    return s in SYMBOLS
+    return is_in(s, SYMBOL)
 
 
 def lex_symbol(cursor: Cursor) -> Token:
@@ -195,51 +198,54 @@ def lex_symbol(cursor: Cursor) -> Token:
     Lex a symbol
     '''
     if is_operator(cursor.peek()):
-        text = cursor.take_while(is_operator)
+        cursor.skip_class(OPERATOR)
         kind = Operator()
     elif is_delimiter(cursor.peek()):
-        text = cursor.take()
+        cursor.skip()
         kind = Delimiter()
     else:
-        text = cursor.take()
+        cursor.skip()
         kind = Symbol()
     span = cursor.consume_span()
-    return Token(span, kind, text)
+    return Token(span, kind)
 
 
 def lex_string(cursor: Cursor) -> Token:
     '''
     Lex a string
     '''
-    text = cursor.take()
-    terminated = False
-    while cursor.has():
-        c = lex_escaped(cursor)
-        text += c
-        if c == "\"":
-            terminated = True
-            break
+    cursor.index, terminated = scan_string(cursor.src.text, cursor.index)
     span = cursor.consume_span()
-    return Token(span, String(terminated), text)
+    return Token(span, String(terminated))
 
 
 ESCAPED = {"\\n": "\n", "\\r": "\r", "\\t": "\t", "\\\"": "\"", "\\\\": "\\"}
 
+STRING_STOP = re.compile(r'["\\]')
 
-def lex_escaped(cursor: Cursor) -> str:
+
+def scan_string(text: str, index: int) -> Tuple[int, bool]:
     '''
-    Lex an escaped character
+    Find the end of a string starting at `index`, jumping from one quote or
+    backslash to the next.
+    Returns the end index and whether the string is terminated.
     '''
-    if cursor.peek(2) in ESCAPED:
-        return cursor.take(2)
-    else:
-        return cursor.take()
+    index += 1
+    while True:
+        m = STRING_STOP.search(text, index)
+        if m is None:
+            return len(text), False
+        index = m.end()
+        if m.group() == "\"":
+            return index, True
+        elif text[index - 1:index + 1] in ESCAPED:
+            index += 1
 
 
 def lex_unknown(cursor: Cursor) -> Token:
     '''
     Lex an unknown token
     '''
-    text = cursor.take()
+    cursor.skip()
     span = cursor.consume_span()
-    return Token(span, Unknown(), text)
+    return Token(span, Unknown())
@@ -0,0 +1,103 @@
+'''
+Split source code into raw tokens using a single compiled master pattern.
+
+Produces exactly the same tokens as `lmd.lexing.lex.lex_source`, but every
+token class is recognised by one regular expression match instead of trying
+each predicate in turn.
+
+Sources holding UTF-8 bytes, such as `MappedSource`, are lexed with a bytes
+version of the same pattern. ASCII is matched directly on the bytes and only
+non-ASCII characters are decoded, so spans are byte offsets.
+'''
+
+import re
+
+from lmd.util.source import *
+from lmd.util.error import ErrorReport
+from lmd.lexing.raw_token import *
+from lmd.lexing.lex import PREFIX_TO_BASE, scan_block_comment
+from lmd.lexing.chars import *
+
+
+MASTER_PATTERN = re.compile(r'''
+      (?P<whitespace>[ \t\r\n]+)
+    | (?P<line_comment>--[^\n]*)
+    | (?P<block_comment>\{-)
+    | (?P<number>(?=[0-9])(?P<prefix>0[box])?(?:[0-9A-Za-z_]|\.(?=[0-9A-Za-z_]))*)
+    | (?P<name>[A-Za-z_'][0-9A-Za-z_']*)
+    | (?P<operator>[-+*/%&|^~<=>$.]+)
+    | (?P<delimiter>[()\[\]{}])
+    | (?P<symbol>[:,;])
+    | (?P<string>"(?:\\[nrt"\\]|[^"])*(?P<closing>")?)
+    | (?P<other>.)
+''', re.VERBOSE | re.DOTALL)
+
+BYTES_MASTER_PATTERN = re.compile(
+    MASTER_PATTERN.pattern.encode(), MASTER_PATTERN.flags & ~re.UNICODE)
+BYTES_PREFIX_TO_BASE = {
+    prefix.encode(): base for prefix, base in PREFIX_TO_BASE.items()}
+
+
+def lex_source(src: Source, error_report: ErrorReport = None) -> list:
+    '''
+    Lex a source in to a list of raw tokens.
+    '''
+    return list(iter_source(src, 0, error_report))
+
+
+def iter_source(src: Source, index: int = 0, error_report: ErrorReport = None):
+    '''
+    Lex a source lazily, yielding raw tokens one by one.
+    Lexing starts at `index`, which must be a token boundary.
+    Stops early once the error budget of the report, if any, is exhausted.
+    '''
+    text = src.text
+    if isinstance(text, str):
+        match = MASTER_PATTERN.match
+        prefix_to_base = PREFIX_TO_BASE
+    else:
+        match = BYTES_MASTER_PATTERN.match
+        prefix_to_base = BYTES_PREFIX_TO_BASE
+
+    exhausted = None if error_report is None else error_report.exhausted
+    length = len(text)
+    while index < length:
+        m = match(text, index)
+        group = m.lastgroup
+        end = m.end()
+
+        if group == 'whitespace':
+            kind = Whitespace()
+        elif group == 'name':
+            if not text[end:end + 1].isascii():
+                end = scan(text, end, NAME_CONTINUE)
+            kind = Name()
+        elif group == 'operator':
+            kind = Operator()
+        elif group == 'delimiter':
+            kind = Delimiter()
+        elif group == 'symbol':
+            kind = Symbol()
+        elif group == 'number':
+            kind = Number(prefix_to_base.get(m.group('prefix'), 10))
+        elif group == 'line_comment':
+            kind = LineComment()
+        elif group == 'block_comment':
+            end, terminated = scan_block_comment(text, index)
+            kind = BlockComment(terminated)
+        elif group == 'string':
+            kind = String(m.group('closing') is not None)
+        else:
+            c, end = char_at(text, index)
+            if is_in(c, NAME_START):
+                end = scan(text, end, NAME_CONTINUE)
+                kind = Name()
+            else:
+                kind = Unknown()
+
+        token = Token(Span(src, index, end), kind)
+        if exhausted is not None and exhausted():
+            error_report.stop(token.span)
+            return
+        yield token
+        index = end
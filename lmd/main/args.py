@@ -5,4 +5,24 @@ def default_arg_parser():
     parser = ArgumentParser(description='LMD interpreter')
     parser.add_argument('src', metavar='SRC', type=str,
                         nargs='+', default=None)
+    parser.add_argument('--lexer', choices=['pattern', 'predicate'],
+                        default='pattern',
+                        help='lexer engine used to split sources into tokens')
+    parser.add_argument('--front-end', choices=['list', 'stream', 'compact', 'fused'],
+                        default='list',
+                        help='how tokens are passed from the lexer to the '
+                        'parser: a list per stage, a stream of generators, '
+                        'compact column storage or one fused pass')
+    parser.add_argument('--parser',
+                        choices=['combinators', 'compiled', 'stackless'],
+                        default='combinators',
+                        help='parser engine: the combinator grammar, '
+                        'Python code generated from it or generated code '
+                        'driven from an explicit stack, for deep nesting')
+    parser.add_argument('--mmap', action='store_true',
+                        help='memory-map sources and lex their UTF-8 bytes '
+                        'directly (requires the pattern lexer)')
+    parser.add_argument('--max-errors', type=int, default=100,
+                        help='stop lexing, cooking and parsing after this '
+                        'many errors, 0 for no limit')
     return parser
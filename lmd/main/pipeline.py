@@ -1,20 +1,22 @@
 from typing import List
 
 from lmd.util.source import *
+from lmd.util.compact import CompactTokens
 from lmd.output.error import SimpleErrorPrinter
 from lmd.util.error import ErrorReport
-from lmd.lexing import lex
-from lmd.cooking import cook, tokens
-from lmd.parsing import parse
+from lmd.util.symbol import SymbolTable
+from lmd.lexing import lex, pattern_lex
+from lmd.cooking import cook, trivia
+from lmd.parsing import parse, compiler, stackless
 from lmd.modules import module_tree
 from lmd.output.ast import *
 from lmd.ast import expressions
 from lmd.semantic_analysis import semantic_analysis
 
 
-def run_pipeline(srcs, pipeline):
+def run_pipeline(srcs, pipeline, max_errors: int = None):
     error_printer = SimpleErrorPrinter()
-    report = ErrorReport()
+    report = ErrorReport(max_errors)
     value = srcs
     for phase in pipeline:
         value = phase(value, report)
@@ -24,58 +26,182 @@ def run_pipeline(srcs, pipeline):
     return value
 
 
-def lex_srcs(srcs, _):
-    return [lex.lex_source(src) for src in srcs]
+LEXERS = {
+    'predicate': lex,
+    'pattern': pattern_lex,
+}
 
 
-def cook_tokens(srcs, report):
-    return [cook.cook_tokens(src, report) for src in srcs]
+def lex_srcs_with(lexer):
+    def lex_srcs(srcs, report):
+        return [lexer.lex_source(src, report) for src in srcs]
+    return lex_srcs
+
+
+lex_srcs = lex_srcs_with(pattern_lex)
+
+
+def cook_tokens_with(symbols):
+    def cook_tokens(srcs, report):
+        return [cook.cook_tokens(src, report, symbols) for src in srcs]
+    return cook_tokens
 
 
 def filter_whitespace(srcs, _):
-    return [[token for token in cooked_tokens
-            if not token.kind.extends(tokens.Comment())
-            and not token.kind.extends(tokens.Whitespace())]
+    return [list(trivia.attach_trivia(cooked_tokens))
             for cooked_tokens in srcs]
 
 
-def parse_tokens(srcs, report):
-    return [parse.parse_tokens(cooked_tokens, report)
-            for cooked_tokens in srcs]
+PARSERS = {
+    'combinators': parse,
+    'compiled': compiler,
+    'stackless': stackless,
+}
+
+
+def parse_unless_exhausted(parser, tokens, report):
+    '''
+    Parse the tokens of one source, or give None without parsing once the
+    error budget is exhausted. Earlier phases stop then, so the tokens may
+    be cut short or missing altogether.
+    '''
+    if report.exhausted():
+        first = next(iter(tokens), None)
+        if first is not None:
+            report.stop(first.span)
+        return None
+    return parser.parse_tokens(tokens, report)
+
+
+def parse_tokens_with(parser):
+    def parse_tokens(srcs, report):
+        return [parse_unless_exhausted(parser, cooked_tokens, report)
+                for cooked_tokens in srcs]
+    return parse_tokens
+
+
+parse_tokens = parse_tokens_with(parse)
+
+
+def stream_parse_srcs_with(lexer, parser, symbols):
+    '''
+    Lex, cook, filter and parse each source as one chain of generators.
+    The parser pulls tokens on demand, so no stage builds a full token list.
+    Cooking errors are reported together with parsing errors.
+    '''
+    def stream_parse_srcs(srcs, report):
+        return [parse_unless_exhausted(parser, trivia.attach_trivia(
+            cook.iter_cooked_in_place(lexer.iter_source(src, 0, report),
+                                      report, symbols)),
+            report) for src in srcs]
+    return stream_parse_srcs
+
+
+def compact_srcs_with(lexer, symbols):
+    '''
+    Lex, cook and filter each source straight into compact token storage.
+    '''
+    def compact_srcs(srcs, report):
+        return [CompactTokens.from_tokens(src, trivia.attach_trivia(
+            cook.iter_cooked_in_place(lexer.iter_source(src, 0, report),
+                                      report, symbols)))
+            for src in srcs]
+    return compact_srcs
+
+
+def fused_srcs_with(lexer, symbols):
+    '''
+    Lex, cook and filter each source in one pass into a single token list.
+    Raw tokens are cooked in place instead of being copied at each stage,
+    and whitespace and comments become trivia without being cooked.
+    '''
+    def fused_srcs(srcs, report):
+        return [list(trivia.attach_trivia(
+            cook.iter_cooked_in_place(lexer.iter_source(src, 0, report),
+                                      report, symbols)))
+            for src in srcs]
+    return fused_srcs
+
+
+def build_module_tree_with(symbols):
+    def build_module_tree(asts, report):
+        program_module_tree = {}
+        for ast in asts:
+            tree = module_tree.build_module_tree(ast, symbols)
+            program_module_tree = module_tree.merge_trees(
+                program_module_tree, tree)
+        module_tree.report_multiple_definitions(program_module_tree, report)
+        return program_module_tree, asts
+    return build_module_tree
+
+
+def transform_expressions_with(symbols):
+    def transform_expressions(asts, report):
+        asts = [
+            expressions.transform_expressions(ast, report, symbols)
+            for ast in asts
+        ]
+        return asts
+    return transform_expressions
+
+
+def analyse_semantics_with(symbols):
+    def analyse_semantics(asts, report):
+        semantic_analysis.analyse_semantics(asts, report, symbols)
+        return asts
+    return analyse_semantics
+
+
+def list_front_end(lexer, parser, symbols):
+    return [
+        lex_srcs_with(lexer),
+        cook_tokens_with(symbols),
+        filter_whitespace,
+        parse_tokens_with(parser),
+    ]
 
 
-def build_module_tree(asts, report):
-    program_module_tree = {}
-    for ast in asts:
-        tree = module_tree.build_module_tree(ast)
-        program_module_tree = module_tree.merge_trees(
-            program_module_tree, tree)
-    module_tree.report_multiple_definitions(program_module_tree, report)
-    return program_module_tree, asts
+def stream_front_end(lexer, parser, symbols):
+    return [stream_parse_srcs_with(lexer, parser, symbols)]
 
 
-def transform_expressions(asts, report):
-    asts = [
-        expressions.transform_expressions(ast, report)
-        for ast in asts
-    ]
-    return asts
+def compact_front_end(lexer, parser, symbols):
+    return [compact_srcs_with(lexer, symbols), parse_tokens_with(parser)]
 
-def analyse_semantics(asts, report):
-    semantic_analysis.analyse_semantics(asts, report)
-    return asts
 
-def interpret_sources(sources: List[Source]):
-    pipeline = [
-        lex_srcs,
-        cook_tokens,
-        filter_whitespace,
-        parse_tokens,
-        transform_expressions,
-        analyse_semantics
+def fused_front_end(lexer, parser, symbols):
+    return [fused_srcs_with(lexer, symbols), parse_tokens_with(parser)]
+
+
+FRONT_ENDS = {
+    'list': list_front_end,
+    'stream': stream_front_end,
+    'compact': compact_front_end,
+    'fused': fused_front_end,
+}
+
+
+def front_end(lexer: str = 'pattern', mode: str = 'list',
+              parser: str = 'combinators', symbols: SymbolTable = None):
+    '''
+    Phases turning sources into ASTs.
+    Names are interned into `symbols`, or into a new table if none is given.
+    '''
+    if symbols is None:
+        symbols = SymbolTable()
+    return FRONT_ENDS[mode](LEXERS[lexer], PARSERS[parser], symbols)
+
+
+def interpret_sources(sources: List[Source], lexer: str = 'pattern',
+                      mode: str = 'list', max_errors: int = None,
+                      parser: str = 'combinators'):
+    symbols = SymbolTable()
+    pipeline = front_end(lexer, mode, parser, symbols) + [
+        transform_expressions_with(symbols),
+        analyse_semantics_with(symbols)
     ]
 
-    asts = run_pipeline(sources, pipeline)
+    asts = run_pipeline(sources, pipeline, max_errors)
 
     printer = ASTPrinter()
     for ast in asts:
@@ -1,19 +1,26 @@
 from lmd.ast.visitor import Visitor
 from lmd.modules.error import *
+from lmd.util.symbol import SymbolTable
 
 
 class ModuleTreeBuilder(Visitor):
-    def __init__(self):
+    '''
+    Builds nested dicts of modules and definitions keyed by symbol ids
+    '''
+
+    def __init__(self, symbols: SymbolTable):
+        self.symbols = symbols
+        main = symbols.intern('Main')
         self.tree = {
-            'Main': {}
+            main: {}
         }
-        self.tree_stack = [self.tree['Main']]
+        self.tree_stack = [self.tree[main]]
 
     def current_tree(self):
         return self.tree_stack[-1]
 
     def path_node_to_list(self, node):
-        return [part.token.text for part in node.path]
+        return [self.symbols.of(part.token) for part in node.path]
 
     def push(self, path_node):
         path = self.path_node_to_list(path_node)
@@ -34,20 +41,20 @@ class ModuleTreeBuilder(Visitor):
         self.pop()
 
     def visit_pub_node(self, node):
-        name = node.node.names[0].token.text
+        name = self.symbols.of(node.node.names[0].token)
         if name not in self.current_tree():
             self.current_tree()[name] = []
         self.current_tree()[name].append(node)
 
     def visit_const_node(self, node):
-        name = node.names[0].token.text
+        name = self.symbols.of(node.names[0].token)
         if name not in self.current_tree():
             self.current_tree()[name] = []
         self.current_tree()[name].append(node)
 
 
-def build_module_tree(node):
-    builder = ModuleTreeBuilder()
+def build_module_tree(node, symbols: SymbolTable):
+    builder = ModuleTreeBuilder(symbols)
     builder.visit(node)
     return builder.tree
 
@@ -25,16 +25,16 @@ class SimpleErrorPrinter:
         max_line_length = len(str(max(lines)))
         for message in messages:
             spans = message.span.split()
-            for i, span in enumerate(spans):
-                line_number, column = span.source.index_to_line_and_column(
-                    span.begin)
+            positions = message.span.source.indices_to_lines_and_columns(
+                span.begin for span in spans)
+            for i, (span, (line_number, column)) in enumerate(zip(spans, positions)):
                 line = span.source.lines[line_number]
                 prefix = f"{line_number + 1:>{max_line_length}} | "
                 if i + 1 < len(spans):
                     underline_prefix = " " * max_line_length + " | " + " " * column
                 else:
                     underline_prefix = " " * (len(prefix) + column)
-                underline = underline_prefix + "^" * span.len()
+                underline = underline_prefix + "^" * max(span.width(), 1)
                 print(prefix + line)
                 print(underline)
 
@@ -1,4 +1,6 @@
 from . import error
+from . import stream
 from . import cursor
+from . import memo
 from . import parse
 from . import combinators
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Callable, List
+from typing import Callable, List, Optional, Tuple
 from enum import Enum, auto
 
 from dataclasses import dataclass
@@ -23,36 +23,88 @@ class ParsingState(Enum):
 
 
 class Result:
-    def __init__(self, cursor, values, errors, state):
-        self.cursor = cursor
+    '''
+    Outcome of a parser. `position` is the index of the token at which
+    parsing stopped.
+    '''
+
+    def __init__(self, position, values, errors, state):
+        self.position = position
         self.values = values
         self.errors = errors
         self.state = state
 
-    def Ok(cursor, values, errors):
-        return Result(cursor, values, errors, ParsingState.OK)
+    def Ok(position, values, errors):
+        return Result(position, values, errors, ParsingState.OK)
 
-    def Backtracked(cursor, values, errors):
-        return Result(cursor, values, errors, ParsingState.BACKTRACKED)
+    def Backtracked(position, values, errors):
+        return Result(position, values, errors, ParsingState.BACKTRACKED)
 
-    def Err(cursor, values, errors):
-        return Result(cursor, values, errors, ParsingState.ERR)
+    def Err(position, values, errors):
+        return Result(position, values, errors, ParsingState.ERR)
+
+    def copy(self):
+        return Result(self.position, list(self.values), list(self.errors), self.state)
 
     def mapped(self, f):
         if self.state == ParsingState.OK:
-            return Result.Ok(self.cursor, [f(self.values)], self.errors)
+            return Result.Ok(self.position, [f(self.values)], self.errors)
         else:
             return self
 
     def __repr__(self):
-        return f'Result({self.state}, {self.cursor}, {self.values}, {self.errors})'
+        return f'Result({self.state}, {self.position}, {self.values}, {self.errors})'
+
+
+def joined(first: list, second: list) -> list:
+    '''
+    `first` followed by `second`, for accumulating result lists.
+
+    A result owns its lists and is dropped once they are joined, so the
+    lists are reused instead of copied: an empty one is skipped and the
+    other is extended in place. Each value and error is then copied only
+    when it joins a list that already holds something, not once per level
+    of the grammar it passes through.
+    '''
+    if not first:
+        return second
+    first += second
+    return first
 
 
 class Parser(ABC):
+    '''
+    All parsers of one parse share a single cursor. A parser leaves the
+    cursor at the position of its result, and callers that need to try
+    something else from where they started mark the cursor before and
+    reset it afterwards.
+    '''
     @abstractmethod
     def parse(self, cursor: Cursor, backtrack=False) -> Result:
         pass
 
+    def first(self) -> Optional[List[TokenKind]]:
+        '''
+        Kinds of the tokens the parser can start with, None if unknown.
+
+        A parser that is not nullable, when allowed to backtrack,
+        backtracks on any token that extends none of these kinds.
+        '''
+        return None
+
+    def nullable(self) -> bool:
+        '''
+        Whether the parser may succeed without taking any token
+        '''
+        return True
+
+    def recursive(self) -> bool:
+        '''
+        Whether the parser can reach a rule that refers back to itself,
+        so that parsing it may nest without bound
+        '''
+        return False
+
     def __or__(self, other):
         return Or([self, other])
 
@@ -78,6 +130,15 @@ class Map(Parser):
         else:
             return result
 
+    def first(self):
+        return self.parser.first()
+
+    def nullable(self):
+        return self.parser.nullable()
+
+    def recursive(self):
+        return self.parser.recursive()
+
     def __repr__(self):
         return f'Map({self.parser}, {self.f})'
 
@@ -97,32 +158,96 @@ class Conditional(Parser):
         self.then = then
 
     def parse(self, cursor: Cursor, backtrack=False) -> Result:
-        condition_result = self.condition.parse(cursor.clone(), backtrack)
+        condition_result = self.condition.parse(cursor, backtrack)
         if condition_result.state == ParsingState.OK:
-            then_result = self.then.parse(
-                condition_result.cursor, backtrack=False)
-            then_result.values = condition_result.values + then_result.values
-            then_result.errors = condition_result.errors + then_result.errors
+            then_result = self.then.parse(cursor, backtrack=False)
+            then_result.values = joined(condition_result.values, then_result.values)
+            then_result.errors = joined(condition_result.errors, then_result.errors)
             return then_result
         else:
             return condition_result
 
+    def first(self):
+        # A nullable condition would run `then` without backtracking
+        if self.condition.nullable():
+            return None
+        return self.condition.first()
+
+    def nullable(self):
+        return False
+
+    def recursive(self):
+        return self.condition.recursive() or self.then.recursive()
+
     def __repr__(self):
         return f'{self.condition} >> {self.then}'
 
 
 class Or(Parser):
+    '''
+    Ordered choice. Alternatives are tried in order until one does not
+    backtrack, the last one is tried as if it was the only one.
+
+    Alternatives that cannot start with the next token are skipped. They
+    are looked up by the bits of the token's kind that matter to the first
+    kinds of the alternatives, and the candidates for each such key are
+    computed once. The last alternative is always a candidate.
+    '''
+
     def __init__(self, parsers: List[Parser]):
         self.parsers = parsers
+        self.firsts = None
+        self.mask = 0
+        self.candidates = {}
+
+    def build_dispatch(self):
+        self.firsts = [
+            None if parser.nullable() else parser.first()
+            for parser in self.parsers[:-1]
+        ]
+        for kinds in self.firsts:
+            for kind in kinds or []:
+                self.mask |= kind.base_mask()
+
+    def dispatch(self, kind: TokenKind) -> List[Parser]:
+        if self.firsts is None:
+            self.build_dispatch()
+        key = kind.code() & self.mask
+        candidates = self.candidates.get(key)
+        if candidates is None:
+            candidates = [
+                parser for parser, kinds in zip(self.parsers, self.firsts)
+                if kinds is None or any(kind.extends(first) for first in kinds)
+            ] + self.parsers[-1:]
+            self.candidates[key] = candidates
+        return candidates
 
     def parse(self, cursor: Cursor, backtrack=False) -> Result:
-        for i, parser in enumerate(self.parsers):
-            if i == len(self.parsers) - 1:
+        candidates = self.dispatch(cursor.peek_one().kind)
+        mark = cursor.mark()
+        for i, parser in enumerate(candidates):
+            if i == len(candidates) - 1:
                 return parser.parse(cursor, backtrack)
             else:
-                result = parser.parse(cursor.clone(), True)
+                result = parser.parse(cursor, True)
                 if result.state != ParsingState.BACKTRACKED:
                     return result
+                cursor.reset(mark)
+
+    def first(self):
+        kinds = []
+        for parser in self.parsers:
+            first = parser.first()
+            if first is None:
+                return None
+            kinds += first
+        return kinds
+
+    def nullable(self):
+        return any(parser.nullable() for parser in self.parsers)
+
+    def recursive(self):
+        return any(parser.recursive() for parser in self.parsers)
 
     def __or__(self, other):
         return Or(self.parsers + [other])
@@ -146,21 +271,39 @@ class Sequential(Parser):
             if err and not isinstance(parser, Drop):
                 values.append(None)
             else:
-                result = parser.parse(cursor.clone(), backtrack=backtrack)
+                mark = cursor.mark()
+                result = parser.parse(cursor, backtrack=backtrack)
                 if result.state == ParsingState.BACKTRACKED:
-                    return Result.Backtracked(cursor, [], [])
+                    cursor.reset(mark)
+                    return Result.Backtracked(mark, [], [])
 
-                values += result.values
-                errors += result.errors
-                cursor = result.cursor
+                values = joined(values, result.values)
+                errors = joined(errors, result.errors)
 
                 if result.state != ParsingState.OK:
                     err = True
 
         if err:
-            return Result.Err(cursor, values, errors)
+            return Result.Err(cursor.index, values, errors)
         else:
-            return Result.Ok(cursor, values, errors)
+            return Result.Ok(cursor.index, values, errors)
+
+    def first(self):
+        kinds = []
+        for parser in self.parsers:
+            first = parser.first()
+            if first is None:
+                return None
+            kinds += first
+            if not parser.nullable():
+                break
+        return kinds
+
+    def nullable(self):
+        return all(parser.nullable() for parser in self.parsers)
+
+    def recursive(self):
+        return any(parser.recursive() for parser in self.parsers)
 
     def __repr__(self):
         return ' + '.join(map(str, self.parsers))
@@ -175,17 +318,34 @@ class Drop(Parser):
         result.values = []
         return result
 
+    def first(self):
+        return self.parser.first()
+
+    def nullable(self):
+        return self.parser.nullable()
+
+    def recursive(self):
+        return self.parser.recursive()
+
 
 class Maybe(Parser):
     def __init__(self, parser: Parser):
         self.parser = parser
 
     def parse(self, cursor: Cursor, backtrack=False) -> Result:
-        result = self.parser.parse(cursor.clone(), backtrack)
+        mark = cursor.mark()
+        result = self.parser.parse(cursor, backtrack)
         if result.state == ParsingState.OK:
             return result
         else:
-            return Result.Ok(cursor, [], [])
+            cursor.reset(mark)
+            return Result.Ok(mark, [], [])
+
+    def first(self):
+        return self.parser.first()
+
+    def recursive(self):
+        return self.parser.recursive()
 
 
 class Repeat(Parser):
@@ -196,13 +356,20 @@ class Repeat(Parser):
         values = []
         errors = []
         while True:
-            result = self.parser.parse(cursor.clone(), True)
+            mark = cursor.mark()
+            result = self.parser.parse(cursor, True)
             if result.state != ParsingState.OK:
-                return Result.Ok(cursor, values, errors)
+                cursor.reset(mark)
+                return Result.Ok(mark, values, errors)
             else:
-                values += result.values
-                errors += result.errors
-                cursor = result.cursor
+                values = joined(values, result.values)
+                errors = joined(errors, result.errors)
+
+    def first(self):
+        return self.parser.first()
+
+    def recursive(self):
+        return self.parser.recursive()
 
     def __repr__(self):
         return f'({self.parser})*'
@@ -211,22 +378,72 @@ class Repeat(Parser):
 class Repeat1(Parser):
     def __init__(self, parser: Parser):
         self.parser = parser
+        self.rest = Repeat(parser)
 
     def parse(self, cursor: Cursor, backtrack=False) -> Result:
-        result = self.parser.parse(cursor.clone(), backtrack)
+        result = self.parser.parse(cursor, backtrack)
         if result.state != ParsingState.OK:
             return result
         else:
-            rest = Repeat(self.parser).parse(result.cursor, True)
-            result.values += rest.values
-            result.errors += rest.errors
-            result.cursor = rest.cursor
+            rest = self.rest.parse(cursor, True)
+            result.values = joined(result.values, rest.values)
+            result.errors = joined(result.errors, rest.errors)
+            result.position = rest.position
             return result
 
+    def first(self):
+        return self.parser.first()
+
+    def nullable(self):
+        return self.parser.nullable()
+
+    def recursive(self):
+        return self.parser.recursive()
+
     def __repr__(self):
         return f'({self.parser})+'
 
 
+class RepeatToEnd(Parser):
+    '''
+    Parse repeatedly until the tokens run out or a repetition fails.
+
+    Tokens before each repetition are released, so memory stays bounded
+    by one repetition when the tokens are streamed. Parsing also stops
+    once the errors so far use up the budget of the cursor's error report.
+    '''
+
+    def __init__(self, parser: Parser):
+        self.parser = parser
+
+    def parse(self, cursor: Cursor, backtrack=False) -> Result:
+        values = []
+        errors = []
+        report = cursor.error_report
+        while cursor.has():
+            if report is not None and report.exhausted(len(errors)):
+                break
+            result = self.parser.parse(cursor, backtrack)
+            values = joined(values, result.values)
+            errors = joined(errors, result.errors)
+            if result.state == ParsingState.ERR:
+                break
+            cursor.release()
+            if cursor.memo is not None:
+                cursor.memo.clear()
+
+        return Result.Ok(cursor.index, values, errors)
+
+    def first(self):
+        return self.parser.first()
+
+    def recursive(self):
+        return self.parser.recursive()
+
+    def __repr__(self):
+        return f'({self.parser})$'
+
+
 class Do(Parser):
     def __init__(self, function: Callable[[Cursor], Result]):
         self.function = function
@@ -236,3 +453,117 @@ class Do(Parser):
 
     def __repr__(self):
         return f'Do({self.function.__name__})'
+
+
+class BuildMode(Enum):
+    '''
+    When a rule builds its node from the parsed values.
+    MAPPED - Only if the rule parsed successfully.
+    NONEMPTY - Whenever any values were parsed, even after an error.
+    ALWAYS - Always, even if nothing was parsed.
+    '''
+    MAPPED = auto()
+    NONEMPTY = auto()
+    ALWAYS = auto()
+
+
+class Rule(Parser):
+    '''
+    Named grammar rule building a node from the values of its parser.
+
+    Rules are created before they are defined, so that a grammar can refer
+    to rules that are defined later, including recursively to itself.
+    The grammar is then built once and reused for every parse.
+
+    `build` is called with the span of the parsed tokens and the values.
+    Results of rules with `memoize` set are kept in the cursor's memo, if
+    it has one, and reused when the rule is tried again at the same token.
+    '''
+
+    def __init__(self, name: str, build: Callable = None,
+                 mode: BuildMode = BuildMode.MAPPED, span: bool = True,
+                 memoize: bool = False):
+        self.name = name
+        self.build = build
+        self.mode = mode
+        self.span = span
+        self.memoize = memoize
+        self.parser = None
+        self.analysing = False
+        self.is_recursive = None
+
+    def define(self, parser: Parser):
+        self.parser = parser
+
+    def parse(self, cursor: Cursor, backtrack=False) -> Result:
+        memo = cursor.memo
+        if memo is None or not self.memoize:
+            return self.parse_rule(cursor, backtrack)
+
+        key = (self, cursor.index, backtrack)
+        result = memo.get(key)
+        if result is None:
+            result = self.parse_rule(cursor, backtrack)
+            memo.put(key, result)
+        else:
+            cursor.reset(result.position)
+        return result
+
+    def parse_rule(self, cursor: Cursor, backtrack=False) -> Result:
+        if self.span:
+            result, span = parse_with_span(self.parser, cursor, backtrack)
+        else:
+            result, span = self.parser.parse(cursor, backtrack), None
+
+        if self.build is None:
+            return result
+        elif self.mode == BuildMode.MAPPED:
+            return result.mapped(lambda values: self.build(span, values))
+        elif self.mode == BuildMode.NONEMPTY and not result.values:
+            return result
+        result.values = [self.build(span, result.values)]
+        return result
+
+    def first(self):
+        # Rules refer to each other, a rule met again while it is being
+        # analysed is assumed to start with anything
+        if self.analysing:
+            return None
+        self.analysing = True
+        try:
+            return self.parser.first()
+        finally:
+            self.analysing = False
+
+    def nullable(self):
+        if self.analysing:
+            return True
+        self.analysing = True
+        try:
+            return self.parser.nullable()
+        finally:
+            self.analysing = False
+
+    def recursive(self):
+        # Reaching a rule that is being analysed closes a cycle through it
+        if self.analysing:
+            return True
+        if self.is_recursive is None:
+            self.analysing = True
+            try:
+                self.is_recursive = self.parser.recursive()
+            finally:
+                self.analysing = False
+        return self.is_recursive
+
+    def __repr__(self):
+        return self.name
+
+
+def parse_with_span(parser: Parser, cursor: Cursor, backtrack=False) -> Tuple[Result, Span]:
+    begin = cursor.peek_one().span.begin
+    source = cursor.peek_one().span.source
+    result = parser.parse(cursor, backtrack=backtrack)
+    end = cursor.prev().span.end
+    span = Span(source, begin, end)
+    return result, span
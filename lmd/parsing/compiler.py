@@ -0,0 +1,549 @@
+'''
+Compilation of the combinator grammar into a specialized Python parser.
+
+The grammar behind `lmd.parsing.parse` is walked once and turned into
+Python source with one function per rule, plus functions for the
+combinators that rules call. Token checks are inlined as tests on kind
+codes, the definition of a rule is inlined into its function and
+combinators pass (state, values, errors) tuples instead of Results.
+
+The generated parser produces the same ASTs and errors as the combinators.
+It does not memoize.
+
+A stackless variant makes the functions of recursive rules and combinators
+generators, which yield the function they call instead of calling it, to
+be driven by `lmd.parsing.stackless`.
+
+The source and code of both variants are cached in `__pycache__` under a
+hash of the variant, the grammar and this compiler, so they are only
+generated again when one of them changes. Files cached for an earlier hash
+of the same root rule and variant are then removed.
+'''
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+from typing import Callable, Dict, List, Tuple
+
+from lmd.util.source import Span
+from lmd.ast.nodes import TokenNode
+
+from lmd.parsing.cursor import Cursor
+from lmd.parsing.combinators import *
+from lmd.parsing.error import expected_kind
+from lmd.parsing import parse
+
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '__pycache__')
+
+
+def plain_return(state: str, values: str, errors: str) -> List[str]:
+    return [f'return {state}, {values}, {errors}']
+
+
+def indented(lines: List[str]) -> List[str]:
+    return ['    ' + line for line in lines]
+
+
+class GrammarCompiler:
+    '''
+    Turns the combinator graph reachable from a rule into Python source.
+
+    Nodes are numbered in the order of a depth first walk. The runtime
+    objects the generated code needs, such as kinds and node builders, are
+    bound to globals named after the node numbers, so the walk alone gives
+    both the bindings and a description of the grammar to hash.
+
+    With `stackless` set, calls to nodes that can nest without bound become
+    `(yield function, bt)`, and the caller is resumed with their result.
+    '''
+
+    def __init__(self, root: Rule, stackless: bool = False):
+        self.root = root
+        self.stackless = stackless
+        self.numbers = {}
+        self.description = []
+        self.bindings = {
+            'OK': ParsingState.OK,
+            'BT': ParsingState.BACKTRACKED,
+            'ERR': ParsingState.ERR,
+            'Span': Span,
+            'TokenNode': TokenNode,
+            'expected_kind': expected_kind,
+            'joined': joined,
+        }
+        self.masks = []
+        self.firsts = {}
+        self.walk(root)
+
+        self.functions = {}
+        self.pending = []
+
+    def walk(self, node: Parser):
+        if id(node) in self.numbers:
+            return
+        number = len(self.numbers)
+        self.numbers[id(node)] = number
+        detail = ''
+
+        if isinstance(node, parse.ParseKind):
+            self.bind_kind(f'KIND_{number}', node.kind)
+            detail = repr(node.kind)
+        elif isinstance(node, parse.Fail):
+            self.bindings[f'ERROR_{number}'] = node.token_error
+            detail = node.token_error.__qualname__
+        elif isinstance(node, Rule):
+            self.bindings[f'BUILD_{number}'] = node.build
+            detail = (node.name, node.mode, node.span, node.build is None)
+        elif isinstance(node, Map):
+            self.bindings[f'MAP_{number}'] = node.f
+        elif isinstance(node, Do):
+            self.bindings[f'DO_{number}'] = node.function
+        elif isinstance(node, Or):
+            firsts = [
+                None if parser.nullable() else parser.first()
+                for parser in node.parsers[:-1]
+            ]
+            self.firsts[number] = firsts
+            for i, kinds in enumerate(firsts):
+                for j, kind in enumerate(kinds or []):
+                    self.bind_kind(f'FIRST_{number}_{i}_{j}', kind)
+            detail = [None if kinds is None else list(map(repr, kinds))
+                      for kinds in firsts]
+        elif not isinstance(node, (Conditional, Sequential, Drop, Maybe,
+                                   Repeat, Repeat1, RepeatToEnd)):
+            raise TypeError(f'cannot compile parser {node!r}')
+
+        children = self.children(node)
+        for child in children:
+            self.walk(child)
+        self.description.append((number, type(node).__name__, detail, [
+            self.number(child) for child in children]))
+
+    def bind_kind(self, name: str, kind: TokenKind):
+        self.bindings[name] = kind
+        self.masks.append(name)
+
+    def children(self, node: Parser) -> List[Parser]:
+        if isinstance(node, (Or, Sequential)):
+            return list(node.parsers)
+        if isinstance(node, Conditional):
+            return [node.condition, node.then]
+        if isinstance(node, Rule):
+            return [node.parser]
+        if isinstance(node, (Map, Drop, Maybe, Repeat, Repeat1, RepeatToEnd)):
+            return [node.parser]
+        return []
+
+    def digest(self) -> str:
+        with open(__file__, 'rb') as f:
+            compiler_source = f.read()
+        text = repr((self.stackless, self.description)).encode() + compiler_source
+        return hashlib.sha256(text).hexdigest()[:20]
+
+    def number(self, node: Parser) -> int:
+        return self.numbers[id(node)]
+
+    # Generation
+
+    def function(self, node: Parser) -> str:
+        '''
+        Name of the function parsing `node`, generated on first use
+        '''
+        name = self.functions.get(id(node))
+        if name is None:
+            if isinstance(node, Rule):
+                name = f'rule_{self.number(node)}_{node.name}'
+            else:
+                name = f'node_{self.number(node)}'
+            self.functions[id(node)] = name
+            self.pending.append(node)
+        return name
+
+    def call(self, node: Parser, bt: str) -> str:
+        if self.stackless and node.recursive():
+            return f'(yield {self.function(node)}, {bt})'
+        return f'{self.function(node)}(cursor, {bt})'
+
+    def generate(self) -> str:
+        lines = [
+            '# Parser generated by lmd.parsing.compiler, do not edit',
+            '',
+        ]
+        for name in self.masks:
+            lines.append(f'MASK_{name} = {name}.base_mask()')
+        root = self.function(self.root)
+
+        while self.pending:
+            node = self.pending.pop()
+            name = self.functions[id(node)]
+            lines += ['', '', f'def {name}(cursor, bt):']
+            if isinstance(node, Rule):
+                lines += indented(self.rule_body(node))
+            else:
+                lines += indented(self.body(node, 'bt', plain_return))
+        lines += ['', '', f'ROOT = {root}']
+        return '\n'.join(lines) + '\n'
+
+    def body(self, node: Parser, bt: str, ret: Callable) -> List[str]:
+        '''
+        Lines that parse `node` and pass its result to `ret`, which gives
+        the lines returning it
+        '''
+        if isinstance(node, parse.ParseKind):
+            return self.parse_kind_body(node, bt, ret)
+        if isinstance(node, parse.Fail):
+            token = 'cursor.peek_one()'
+            return self.backtrack_or_fail(
+                bt, ret, f'ERROR_{self.number(node)}({token})')
+        if isinstance(node, Conditional):
+            return self.conditional_body(node, bt, ret)
+        if isinstance(node, Sequential):
+            return self.sequential_body(node, bt, ret)
+        if isinstance(node, Or):
+            return self.or_body(node, bt, ret)
+        if isinstance(node, Repeat):
+            return ['values = []', 'errors = []'] + \
+                self.repeat_loop(node.parser, ret)
+        if isinstance(node, Repeat1):
+            return self.repeat1_body(node, bt, ret)
+        if isinstance(node, RepeatToEnd):
+            return self.repeat_to_end_body(node, bt, ret)
+        if isinstance(node, Maybe):
+            return [
+                'mark = cursor.index',
+                f'state, values, errors = {self.call(node.parser, bt)}',
+                'if state is OK:',
+            ] + indented(ret('OK', 'values', 'errors')) + [
+                'cursor.index = mark',
+            ] + ret('OK', '[]', '[]')
+        if isinstance(node, Drop):
+            return [f'state, values, errors = {self.call(node.parser, bt)}'] + \
+                ret('state', '[]', 'errors')
+        if isinstance(node, Map):
+            return [
+                f'state, values, errors = {self.call(node.parser, bt)}',
+                'if state is OK:',
+            ] + indented(ret('OK', f'[MAP_{self.number(node)}(values)]', 'errors')) + \
+                ret('state', 'values', 'errors')
+        if isinstance(node, Do):
+            return [f'result = DO_{self.number(node)}(cursor, {bt})'] + \
+                ret('result.state', 'result.values', 'result.errors')
+        # Rules are only called, so that each has a single function
+        return [f'state, values, errors = {self.call(node, bt)}'] + \
+            ret('state', 'values', 'errors')
+
+    def kind_test(self, name: str, code: str = 'token.kind.code()') -> str:
+        return f'{code} & MASK_{name} == MASK_{name}'
+
+    def backtrack_or_fail(self, bt: str, ret: Callable, error: str) -> List[str]:
+        if bt == 'True':
+            return ret('BT', '[]', '[]')
+        if bt == 'False':
+            return ret('ERR', '[]', f'[{error}]')
+        return ['if bt:'] + indented(ret('BT', '[]', '[]')) + \
+            ret('ERR', '[]', f'[{error}]')
+
+    def is_token_check(self, node: Parser) -> bool:
+        if isinstance(node, Drop):
+            node = node.parser
+        return isinstance(node, parse.ParseKind)
+
+    def token_check(self, node: Parser, bt: str, ret: Callable) -> List[str]:
+        '''
+        Lines that take a token of the kind of a ParseKind, or of a dropped
+        one, and return early if there is none
+        '''
+        if isinstance(node, Drop):
+            node = node.parser
+        name = f'KIND_{self.number(node)}'
+        return [
+            'token = cursor.peek_one()',
+            f'if not {self.kind_test(name)}:',
+        ] + indented(self.backtrack_or_fail(
+            bt, ret, f'expected_kind(token, {name})')) + [
+            'cursor.index += 1',
+        ]
+
+    def parse_kind_body(self, node: parse.ParseKind, bt: str, ret: Callable) -> List[str]:
+        return self.token_check(node, bt, ret) + \
+            ret('OK', '[TokenNode(token)]', '[]')
+
+    def conditional_body(self, node: Conditional, bt: str, ret: Callable) -> List[str]:
+        condition = node.condition
+        if self.is_token_check(condition):
+            lines = self.token_check(condition, bt, ret)
+            values = '[]' if isinstance(condition, Drop) else '[TokenNode(token)]'
+            errors = '[]'
+        else:
+            lines = [
+                f'state, values, errors = {self.call(condition, bt)}',
+                'if state is not OK:',
+            ] + indented(ret('state', 'values', 'errors'))
+            values, errors = 'values', 'errors'
+
+        if isinstance(node.then, Sequential):
+            return lines + self.sequential_body(node.then, 'False', ret, values, errors)
+        lines.append(f'state, then_values, then_errors = {self.call(node.then, "False")}')
+        values = 'then_values' if values == '[]' else f'joined({values}, then_values)'
+        errors = 'then_errors' if errors == '[]' else f'joined({errors}, then_errors)'
+        return lines + ret('state', values, errors)
+
+    def sequential_body(self, node: Sequential, bt: str, ret: Callable,
+                        values: str = '[]', errors: str = '[]') -> List[str]:
+        lines = []
+        if values != 'values':
+            lines.append(f'values = {values}')
+        if errors != 'errors':
+            lines.append(f'errors = {errors}')
+        lines.append('err = False')
+
+        for i, parser in enumerate(node.parsers):
+            dropped = isinstance(parser, Drop)
+            if self.is_token_check(parser):
+                element = [
+                    'token = cursor.peek_one()',
+                    f'if {self.kind_test("KIND_" + str(self.number(parser.parser if dropped else parser)))}:',
+                    '    cursor.index += 1',
+                ]
+                if not dropped:
+                    element.append('    values.append(TokenNode(token))')
+                name = f'KIND_{self.number(parser.parser if dropped else parser)}'
+                fail = [f'errors.append(expected_kind(token, {name}))', 'err = True']
+                if bt == 'True':
+                    fail = ret('BT', '[]', '[]')
+                elif bt != 'False':
+                    fail = ['if bt:'] + indented(ret('BT', '[]', '[]')) + fail
+                element += ['else:'] + indented(fail)
+            else:
+                element = ['state, element_values, element_errors = ' +
+                           self.call(parser.parser if dropped else parser, bt)]
+                if bt != 'False':
+                    element = ['mark = cursor.index'] + element + \
+                        ['if state is BT:', '    cursor.index = mark'] + \
+                        indented(ret('BT', '[]', '[]'))
+                if not dropped:
+                    element += self.join('values', 'element_values')
+                element += self.join('errors', 'element_errors') + \
+                    ['if state is not OK:', '    err = True']
+
+            if i > 0 and not dropped:
+                element = ['if err:', '    values.append(None)', 'else:'] + \
+                    indented(element)
+            lines += element
+
+        return lines + ['if err:'] + indented(ret('ERR', 'values', 'errors')) + \
+            ret('OK', 'values', 'errors')
+
+    def join(self, target: str, source: str) -> List[str]:
+        '''
+        Lines appending the list `source` to `target` as `joined` does
+        '''
+        return [
+            f'if not {target}:',
+            f'    {target} = {source}',
+            f'elif {source}:',
+            f'    {target} += {source}',
+        ]
+
+    def or_body(self, node: Or, bt: str, ret: Callable) -> List[str]:
+        number = self.number(node)
+        firsts = self.firsts[number]
+        lines = ['mark = cursor.index', 'code = cursor.peek_one().kind.code()']
+        for i, (parser, kinds) in enumerate(zip(node.parsers, firsts)):
+            if kinds == []:
+                continue
+            if isinstance(parser, parse.ParseKind):
+                attempt = ['token = cursor.peek_one()', 'cursor.index += 1'] + \
+                    ret('OK', '[TokenNode(token)]', '[]')
+            else:
+                attempt = [
+                    f'state, values, errors = {self.call(parser, "True")}',
+                    'if state is not BT:',
+                ] + indented(ret('state', 'values', 'errors')) + [
+                    'cursor.index = mark',
+                ]
+            if kinds is None:
+                lines += attempt
+            else:
+                test = ' or '.join(
+                    self.kind_test(f'FIRST_{number}_{i}_{j}', 'code')
+                    for j in range(len(kinds)))
+                lines += [f'if {test}:'] + indented(attempt)
+        return lines + self.body(node.parsers[-1], bt, ret)
+
+    def repeat_loop(self, parser: Parser, ret: Callable) -> List[str]:
+        if isinstance(parser, parse.ParseKind):
+            name = f'KIND_{self.number(parser)}'
+            step = [
+                'token = cursor.peek_one()',
+                f'if not {self.kind_test(name)}:',
+            ] + indented(ret('OK', 'values', 'errors')) + [
+                'cursor.index += 1',
+                'values.append(TokenNode(token))',
+            ]
+        else:
+            step = [
+                'mark = cursor.index',
+                f'state, item_values, item_errors = {self.call(parser, "True")}',
+                'if state is not OK:',
+                '    cursor.index = mark',
+            ] + indented(ret('OK', 'values', 'errors')) + \
+                self.join('values', 'item_values') + \
+                self.join('errors', 'item_errors')
+        return ['while True:'] + indented(step)
+
+    def repeat1_body(self, node: Repeat1, bt: str, ret: Callable) -> List[str]:
+        if isinstance(node.parser, parse.ParseKind):
+            lines = self.token_check(node.parser, bt, ret) + [
+                'values = [TokenNode(token)]',
+                'errors = []',
+            ]
+        else:
+            lines = [
+                f'state, values, errors = {self.call(node.parser, bt)}',
+                'if state is not OK:',
+            ] + indented(ret('state', 'values', 'errors'))
+        return lines + self.repeat_loop(node.parser, ret)
+
+    def repeat_to_end_body(self, node: RepeatToEnd, bt: str, ret: Callable) -> List[str]:
+        return [
+            'values = []',
+            'errors = []',
+            'report = cursor.error_report',
+            'while cursor.has():',
+            '    if report is not None and report.exhausted(len(errors)):',
+            '        break',
+            f'    state, item_values, item_errors = {self.call(node.parser, bt)}',
+        ] + indented(self.join('values', 'item_values') +
+                     self.join('errors', 'item_errors')) + [
+            '    if state is ERR:',
+            '        break',
+            '    cursor.release()',
+        ] + ret('OK', 'values', 'errors')
+
+    def rule_body(self, rule: Rule) -> List[str]:
+        build = f'BUILD_{self.number(rule)}'
+        span = 'Span(rule_span.source, rule_span.begin, cursor.prev().span.end)' \
+            if rule.span else 'None'
+
+        def rule_return(state, values, errors):
+            if rule.build is None:
+                return plain_return(state, values, errors)
+            if rule.mode == BuildMode.NONEMPTY and values == '[]':
+                return plain_return(state, values, errors)
+            lines = []
+            if not values.isidentifier() and values != '[]':
+                lines.append(f'rule_values = {values}')
+                values = 'rule_values'
+            built = f'[{build}({span}, {values})]'
+            if rule.mode == BuildMode.ALWAYS:
+                return lines + plain_return(state, built, errors)
+            if rule.mode == BuildMode.MAPPED:
+                if state == 'OK':
+                    return lines + plain_return(state, built, errors)
+                if state in ('BT', 'ERR'):
+                    return lines + plain_return(state, values, errors)
+                condition = f'{state} is OK'
+            else:
+                condition = values
+            return lines + [f'if {condition}:'] + \
+                indented(plain_return(state, built, errors)) + \
+                plain_return(state, values, errors)
+
+        lines = ['rule_span = cursor.peek_one().span'] if rule.span else []
+        return lines + self.body(rule.parser, 'bt', rule_return)
+
+
+def load_cached(path: str):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    magic = importlib.util.MAGIC_NUMBER
+    if not data.startswith(magic):
+        return None
+    try:
+        return marshal.loads(data[len(magic):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def write_cache(path: str, data: bytes):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+    except OSError:
+        pass
+
+
+def prune_cache(cache_dir: str, prefix: str, keep: str):
+    '''
+    Remove cached files starting with `prefix` but not with `keep`, left
+    behind by earlier versions of the grammar or of this compiler
+    '''
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(prefix) and not name.startswith(keep) \
+                and not name.endswith('.tmp'):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+
+def compile_grammar(root: Rule, cache_dir: str = CACHE_DIR,
+                    stackless: bool = False) -> Callable:
+    '''
+    Function parsing `root` from a cursor, loaded from the disk cache if
+    the grammar was compiled before
+    '''
+    compiler = GrammarCompiler(root, stackless)
+    prefix = f'grammar-{root.name}-{"stackless" if stackless else "plain"}-'
+    name = f'{prefix}{compiler.digest()}'
+    base = os.path.join(cache_dir, name)
+    code_path = f'{base}.{sys.implementation.cache_tag}.pyc'
+
+    code = load_cached(code_path)
+    if code is None:
+        source = compiler.generate()
+        code = compile(source, f'{base}.py', 'exec')
+        if not sys.dont_write_bytecode:
+            prune_cache(cache_dir, prefix, f'{name}.')
+            write_cache(f'{base}.py', source.encode())
+            write_cache(code_path, importlib.util.MAGIC_NUMBER + marshal.dumps(code))
+
+    namespace = dict(compiler.bindings)
+    exec(code, namespace)
+    return namespace['ROOT']
+
+
+COMPILED: Dict[Tuple[int, bool], Callable] = {}
+
+
+def compiled_program(stackless: bool = False) -> Callable:
+    key = (id(parse.PROGRAM), stackless)
+    parser = COMPILED.get(key)
+    if parser is None:
+        parser = compile_grammar(parse.PROGRAM, stackless=stackless)
+        COMPILED[key] = parser
+    return parser
+
+
+def parse_tokens(tokens, error_report):
+    '''
+    Parse a program with the compiled grammar
+    '''
+    cursor = Cursor(tokens, error_report=error_report)
+    _, values, errors = compiled_program()(cursor, False)
+    parse.report_errors(errors, cursor, error_report)
+    return values[0]
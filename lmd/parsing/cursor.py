@@ -1,20 +1,28 @@
-from typing import List
+from typing import Iterable, List
 
 from lmd.cooking.tokens import Eof
 from lmd.util.token import Token
+from lmd.util.source import Source, Span
+from lmd.parsing.stream import TokenStream
+
+
+# End of file of a stream without tokens, which has no source to point to
+NO_TOKENS_SPAN = Span(Source('<no tokens>', ''), 0, 0)
 
 
 class Cursor:
-    def __init__(self, tokens: List[Token], index: int = 0):
+    def __init__(self, tokens: Iterable[Token], index: int = 0, memo=None,
+                 error_report=None):
+        if not isinstance(tokens, TokenStream):
+            tokens = TokenStream(tokens)
         self.tokens = tokens
         self.index = index
         self.consumed_begin = index
-
-    def clone(self) -> "Cursor":
-        return Cursor(self.tokens, self.index)
+        self.memo = memo
+        self.error_report = error_report
 
     def has(self, cnt: int = 1) -> bool:
-        return self.index + cnt <= len(self.tokens)
+        return self.tokens.has(self.index + cnt)
 
     def peek_one(self) -> Token:
         if not self.has():
@@ -22,15 +30,33 @@ class Cursor:
         else:
             return self.tokens[self.index]
 
-    def eof(self) -> bool:
-        return Token(self.tokens[-1].span, Eof(), "<eof>")
+    def eof(self) -> Token:
+        last = self.tokens.last()
+        span = NO_TOKENS_SPAN if last is None else last.span
+        return Token(span, Eof(), "<eof>")
 
     def peek(self, cnt: int = 1) -> List[Token]:
         return self.tokens[self.index:self.index + cnt]
 
     def prev(self) -> Token:
+        '''
+        The token before the current one. Before the first token it is an
+        empty token where the first token begins, whatever backs the cursor.
+        '''
+        if self.index == 0:
+            span = self.peek_one().span
+            return Token(Span(span.source, span.begin, span.begin), Eof(), '')
         return self.tokens[self.index - 1]
 
+    def mark(self) -> int:
+        '''
+        Current position, to be passed to `reset` to come back to it
+        '''
+        return self.index
+
+    def reset(self, mark: int):
+        self.index = mark
+
     def take_one(self) -> Token:
         result = self.peek_one()
         self.index += 1
@@ -40,3 +66,10 @@ class Cursor:
         result = self.peek(cnt)
         self.index += cnt
         return result
+
+    def release(self):
+        '''
+        Allow the stream to drop tokens before the previous one.
+        No cursor may move back past this point afterwards.
+        '''
+        self.tokens.release(self.index - 1)
@@ -0,0 +1,52 @@
+'''
+Packrat memoization of rule results within one parse
+'''
+
+
+class ParseStatistics:
+    '''
+    Counters of a memoized parse.
+    lookups - Calls of memoized rules.
+    hits - Calls answered from the memo table.
+    memo_size - Largest number of results held in the memo table at once.
+    '''
+
+    def __init__(self):
+        self.lookups = 0
+        self.hits = 0
+        self.memo_size = 0
+
+    def __repr__(self):
+        return (f'ParseStatistics(lookups={self.lookups}, hits={self.hits}, '
+                f'memo_size={self.memo_size})')
+
+
+class Memo:
+    '''
+    Results of memoized rules keyed by rule, token index and whether the
+    rule was allowed to backtrack.
+
+    Only rules created with `memoize=True` are stored, so the table grows
+    with the number of such rules times the number of tokens. It is cleared
+    between top-level statements, as no rule is retried across them.
+    '''
+
+    def __init__(self):
+        self.results = {}
+        self.statistics = ParseStatistics()
+
+    def get(self, key):
+        self.statistics.lookups += 1
+        result = self.results.get(key)
+        if result is not None:
+            self.statistics.hits += 1
+            return result.copy()
+        return None
+
+    def put(self, key, result):
+        self.results[key] = result.copy()
+        if len(self.results) > self.statistics.memo_size:
+            self.statistics.memo_size = len(self.results)
+
+    def clear(self):
+        self.results.clear()
@@ -1,10 +1,9 @@
-from typing import Callable, List, Tuple
-
 from lmd.cooking.tokens import *
 from lmd.util.error import *
 from lmd.ast.nodes import *
 
 from lmd.parsing.cursor import Cursor
+from lmd.parsing.memo import Memo
 from lmd.parsing.combinators import *
 from lmd.parsing.error import *
 
@@ -17,11 +16,17 @@ class ParseKind(Parser):
         token = cursor.peek_one()
         if token.kind.extends(self.kind):
             cursor.take_one()
-            return Result.Ok(cursor, [TokenNode(token)], [])
+            return Result.Ok(cursor.index, [TokenNode(token)], [])
         elif backtrack:
-            return Result.Backtracked(cursor, [], [])
+            return Result.Backtracked(cursor.index, [], [])
         else:
-            return Result.Err(cursor, [], [expected_kind(token, self.kind)])
+            return Result.Err(cursor.index, [], [expected_kind(token, self.kind)])
+
+    def first(self):
+        return [self.kind]
+
+    def nullable(self):
+        return False
 
     def __repr__(self):
         return f'ParseKind({self.kind})'
@@ -34,168 +39,146 @@ class Fail(Parser):
     def parse(self, cursor: Cursor, backtrack=False) -> Result:
         token = cursor.peek_one()
         if backtrack:
-            return Result.Backtracked(cursor, [], [])
+            return Result.Backtracked(cursor.index, [], [])
         else:
-            return Result.Err(cursor, [], [self.token_error(token)])
+            return Result.Err(cursor.index, [], [self.token_error(token)])
 
+    def first(self):
+        return []
 
-def parse_tokens(tokens, error_report):
-    result = parse_program(Cursor(tokens))
-    for error in result.errors:
-        error_report.add(error)
+    def nullable(self):
+        return False
+
+
+def parse_tokens(tokens, error_report, memo: Memo = None):
+    '''
+    Parse a program. Passing a memo turns on packrat parsing,
+    its statistics are updated as the program is parsed.
+    '''
+    cursor = Cursor(tokens, memo=memo, error_report=error_report)
+    result = parse_program(cursor)
+    report_errors(result.errors, cursor, error_report)
     return result.values[0]
 
 
+def report_errors(errors, cursor: Cursor, error_report):
+    '''
+    Add parse errors to the report, and record where parsing stopped if
+    the error budget ran out before the end of the tokens
+    '''
+    for error in errors:
+        error_report.add(error)
+    if error_report.exhausted() and cursor.has():
+        error_report.stop(cursor.peek_one().span)
+
+
 def parse_program(cursor: Cursor) -> Result:
-    def program_parser(cursor, backtrack=False):
-        statements = []
-        errors = []
-        while cursor.has():
-            result = parse_statement(cursor, backtrack)
-            statements += result.values
-            errors += result.errors
-            cursor = result.cursor
-            if result.state == ParsingState.ERR:
-                break
-
-        return Result.Ok(cursor, statements, errors)
-
-    result, span = parse_with_span(Do(program_parser), cursor)
-    result.values = [ProgramNode(span, result.values)]
-    return result
-
-
-def parse_mod(cursor: Cursor, backtrack=False) -> Result:
-    parser = Drop(ParseKind(Keyword(KeywordType.MOD))) \
-        >> (Do(parse_qualified_type) +
-            Drop(ParseKind(OpenDelimiter(DelimiterType.BRACE))) +
-            Repeat(Do(parse_statement)).map(lambda x: x) +
-            Drop(ParseKind(CloseDelimiter(DelimiterType.BRACE)))
-            )
-    result, span = parse_with_span(parser, cursor, backtrack)
-    result = result.mapped(lambda values: ModNode(span, *values))
-    return result
-
-
-def parse_statement(cursor: Cursor, backtrack=False) -> Result:
-    parser = (
-        Do(parse_const) |
-        Do(parse_pub) |
-        Do(parse_mod) |
-        Do(parse_use) |
-        Fail(expected_statement)
-    )
-    return parser.parse(cursor, backtrack)
-
-
-def parse_whitespace(cursor: Cursor) -> Result:
-    return ParseKind(Whitespace())(cursor)
-
-
-def parse_pub(cursor: Cursor, backtrack=False) -> Result:
-    parser = Drop(ParseKind(Keyword(KeywordType.PUB))) >> Do(parse_const)
-    result, span = parse_with_span(parser, cursor, backtrack)
-    if result.values:
-        result.values = [PubNode(span, result.values[0])]
-    return result
-
-
-def parse_const(cursor: Cursor, backtrack=False) -> Result:
-    parser = Drop(ParseKind(Keyword(KeywordType.CONST))) \
-        >> (Repeat1(ParseKind(Identifier())).map(lambda values: values)
-            + Drop(ParseKind(Symbol(SymbolType.ASSIGN)))
-            + Do(parse_expression))
-    result, span = parse_with_span(parser, cursor, backtrack)
-    result = result.mapped(lambda values: ConstNode(span, *values))
-    return result
-
-
-def parse_use(cursor: Cursor, backtrack=False) -> Result:
-    parser = Drop(ParseKind(Keyword(KeywordType.USE))
-                  ) >> Do(parse_qualified_type)
-    result, span = parse_with_span(parser, cursor, backtrack)
-    result = result.mapped(lambda values: UseNode(span, *values))
-    return result
-
-
-def parse_expression(cursor: Cursor, backtrack=False) -> Result:
-    parser = Repeat1(Do(parse_expression_term)) \
-        + Repeat(ParseKind(Operator()) >> Repeat1(Do(parse_expression_term)))
-
-    result = parser.parse(cursor, backtrack)
-    result.values = [value for value in result.values if value]
-    result.values = [ExpressionNode(result.values)]
-    return result
-
-
-def parse_parenthesised_expression(cursor: Cursor, backtrack=False) -> Result:
-    parser = Drop(ParseKind(OpenDelimiter(DelimiterType.PAREN))) >>\
-        Do(parse_expression) +\
-        Drop(ParseKind(CloseDelimiter(DelimiterType.PAREN)))
-    result, span = parse_with_span(parser, cursor, backtrack=backtrack)
-    return result.mapped(lambda values: ParenthesisedExpressionNode(span, *values))
-
-
-def parse_expression_term(cursor: Cursor, backtrack=False) -> Result:
-    parser = (Do(parse_qualified_identifier) |
-              ParseKind(TokenKind(TokenType.LITERAL)) |
-              Do(parse_parenthesised_expression) |
-              Do(parse_if_expression) |
-              Do(parse_fn_expression) |
-              Fail(expected_expression)
-              )
-    result = parser.parse(cursor, backtrack=backtrack)
-    return result
-
-
-def parse_if_expression(cursor: Cursor, backtrack=False) -> Result:
-    parser = Drop(ParseKind(Keyword(KeywordType.IF))) >>\
-        Do(parse_expression) +\
-        Drop(ParseKind(Keyword(KeywordType.THEN))) +\
-        Do(parse_expression) +\
-        Drop(ParseKind(Keyword(KeywordType.ELSE))) +\
-        Do(parse_expression)
-    result, span = parse_with_span(parser, cursor, backtrack)
-    if result.values:
-        result.values = [IfNode(span, *result.values)]
-    return result
-
-
-def parse_fn_expression(cursor: Cursor, backtrack=False) -> Result:
-    parser = Drop(ParseKind(Keyword(KeywordType.FN))) >>\
-        Repeat1(Do(parse_qualified_identifier)).map(lambda values: values) +\
-        Drop(ParseKind(Symbol(SymbolType.FAT_ARROW))) +\
-        Do(parse_expression)
-    result, span = parse_with_span(parser, cursor, backtrack)
-    if result.values:
-        result.values = [FnNode(span, *result.values)]
-    return result
-
-
-def parse_qualified_identifier(cursor: Cursor, backtrack=False) -> Result:
-    parser = Repeat(ParseKind(Type()) + Drop(ParseKind(Symbol(SymbolType.DOT)))) +\
-        ParseKind(Identifier())
-
-    result, span = parse_with_span(parser, cursor, backtrack)
-    if result.values:
-        result.values = [QualifiedIdentifierNode(span, result.values)]
-    return result
-
-
-def parse_qualified_type(cursor: Cursor, backtrack=False) -> Result:
-    parser = Repeat(ParseKind(Type()) + Drop(ParseKind(Symbol(SymbolType.DOT)))) +\
-        ParseKind(Type())
-
-    result, span = parse_with_span(parser, cursor, backtrack)
-    if result.values:
-        result.values = [QualifiedTypeNode(span, result.values)]
-    return result
-
-
-def parse_with_span(parser: Parser, cursor: Cursor, backtrack=False) -> Tuple[Result, Span]:
-    begin = cursor.peek_one().span.begin
-    source = cursor.peek_one().span.source
-    result = parser.parse(cursor, backtrack=backtrack)
-    end = result.cursor.prev().span.end
-    span = Span(source, begin, end)
-    return result, span
+    return PROGRAM.parse(cursor)
+
+
+def expression_node(_, values):
+    return ExpressionNode([value for value in values if value])
+
+
+# Rules are declared first so that they can refer to each other
+PROGRAM = Rule('program', lambda span, values: ProgramNode(span, values),
+               BuildMode.ALWAYS)
+STATEMENT = Rule('statement', span=False)
+MOD = Rule('mod', lambda span, values: ModNode(span, *values))
+PUB = Rule('pub', lambda span, values: PubNode(span, values[0]),
+           BuildMode.NONEMPTY)
+CONST = Rule('const', lambda span, values: ConstNode(span, *values))
+USE = Rule('use', lambda span, values: UseNode(span, *values))
+EXPRESSION = Rule('expression', expression_node, BuildMode.ALWAYS, span=False)
+EXPRESSION_TERM = Rule('expression_term', span=False, memoize=True)
+PARENTHESISED_EXPRESSION = Rule(
+    'parenthesised_expression',
+    lambda span, values: ParenthesisedExpressionNode(span, *values))
+IF_EXPRESSION = Rule('if_expression', lambda span, values: IfNode(span, *values),
+                     BuildMode.NONEMPTY)
+FN_EXPRESSION = Rule('fn_expression', lambda span, values: FnNode(span, *values),
+                     BuildMode.NONEMPTY)
+QUALIFIED_IDENTIFIER = Rule(
+    'qualified_identifier',
+    lambda span, values: QualifiedIdentifierNode(span, values),
+    BuildMode.NONEMPTY)
+QUALIFIED_TYPE = Rule(
+    'qualified_type',
+    lambda span, values: QualifiedTypeNode(span, values),
+    BuildMode.NONEMPTY)
+
+
+PROGRAM.define(RepeatToEnd(STATEMENT))
+
+STATEMENT.define(
+    CONST |
+    PUB |
+    MOD |
+    USE |
+    Fail(expected_statement)
+)
+
+MOD.define(
+    Drop(ParseKind(Keyword(KeywordType.MOD)))
+    >> (QUALIFIED_TYPE +
+        Drop(ParseKind(OpenDelimiter(DelimiterType.BRACE))) +
+        Repeat(STATEMENT).map(lambda x: x) +
+        Drop(ParseKind(CloseDelimiter(DelimiterType.BRACE))))
+)
+
+PUB.define(Drop(ParseKind(Keyword(KeywordType.PUB))) >> CONST)
+
+CONST.define(
+    Drop(ParseKind(Keyword(KeywordType.CONST)))
+    >> (Repeat1(ParseKind(Identifier())).map(lambda values: values)
+        + Drop(ParseKind(Symbol(SymbolType.ASSIGN)))
+        + EXPRESSION)
+)
+
+USE.define(Drop(ParseKind(Keyword(KeywordType.USE))) >> QUALIFIED_TYPE)
+
+EXPRESSION.define(
+    Repeat1(EXPRESSION_TERM)
+    + Repeat(ParseKind(Operator()) >> Repeat1(EXPRESSION_TERM))
+)
+
+PARENTHESISED_EXPRESSION.define(
+    Drop(ParseKind(OpenDelimiter(DelimiterType.PAREN)))
+    >> EXPRESSION
+    + Drop(ParseKind(CloseDelimiter(DelimiterType.PAREN)))
+)
+
+EXPRESSION_TERM.define(
+    QUALIFIED_IDENTIFIER |
+    ParseKind(TokenKind(TokenType.LITERAL)) |
+    PARENTHESISED_EXPRESSION |
+    IF_EXPRESSION |
+    FN_EXPRESSION |
+    Fail(expected_expression)
+)
+
+IF_EXPRESSION.define(
+    Drop(ParseKind(Keyword(KeywordType.IF)))
+    >> EXPRESSION
+    + Drop(ParseKind(Keyword(KeywordType.THEN)))
+    + EXPRESSION
+    + Drop(ParseKind(Keyword(KeywordType.ELSE)))
+    + EXPRESSION
+)
+
+FN_EXPRESSION.define(
+    Drop(ParseKind(Keyword(KeywordType.FN)))
+    >> Repeat1(QUALIFIED_IDENTIFIER).map(lambda values: values)
+    + Drop(ParseKind(Symbol(SymbolType.FAT_ARROW)))
+    + EXPRESSION
+)
+
+QUALIFIED_IDENTIFIER.define(
+    Repeat(ParseKind(Type()) + Drop(ParseKind(Symbol(SymbolType.DOT))))
+    + ParseKind(Identifier())
+)
+
+QUALIFIED_TYPE.define(
+    Repeat(ParseKind(Type()) + Drop(ParseKind(Symbol(SymbolType.DOT))))
+    + ParseKind(Type())
+)
@@ -0,0 +1,53 @@
+'''
+Parsing with an explicit stack instead of the Python call stack.
+
+The combinator and compiled parsers nest one Python call per nested
+expression, so deeply nested programs run into the interpreter's
+recursion limit. Here the grammar is compiled in the stackless variant of
+`lmd.parsing.compiler`: the functions of rules and combinators that can
+nest without bound are generators, which yield the function they call and
+are resumed with its result. The generators waiting for results are kept
+in a list, so nesting depth is limited only by memory. Everything else is
+called directly as in the compiled parser.
+
+The stackless parser produces the same ASTs and errors as the combinators.
+'''
+
+from typing import Callable, Tuple
+
+from lmd.parsing.cursor import Cursor
+from lmd.parsing.compiler import compiled_program
+from lmd.parsing.parse import report_errors
+
+
+def run(function: Callable, cursor: Cursor, bt: bool) -> Tuple:
+    '''
+    Run a generated stackless function and every function it calls
+    '''
+    # The send methods of the waiting generators, the innermost one in `send`
+    stack = []
+    push, pop = stack.append, stack.pop
+    send = function(cursor, bt).send
+    result = None
+    while True:
+        try:
+            function, bt = send(result)
+        except StopIteration as stop:
+            if not stack:
+                return stop.value
+            send = pop()
+            result = stop.value
+        else:
+            push(send)
+            send = function(cursor, bt).send
+            result = None
+
+
+def parse_tokens(tokens, error_report):
+    '''
+    Parse a program with the stackless compiled grammar
+    '''
+    cursor = Cursor(tokens, error_report=error_report)
+    _, values, errors = run(compiled_program(stackless=True), cursor, False)
+    report_errors(errors, cursor, error_report)
+    return values[0]
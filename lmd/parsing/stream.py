@@ -0,0 +1,72 @@
+'''
+Buffered token stream feeding the parser cursor
+'''
+
+from collections.abc import Sequence
+from typing import Iterable
+
+from lmd.util.token import Token
+
+
+class TokenStream:
+    '''
+    Random access to tokens pulled on demand from an iterable.
+
+    Tokens are buffered from the first unreleased one to the furthest one
+    looked at, so memory is bounded by the parser's lookahead rather than by
+    the length of the input. Sequences such as lists are used directly and
+    never released.
+    '''
+
+    def __init__(self, tokens: Iterable[Token]):
+        if isinstance(tokens, Sequence):
+            self.buffer = tokens
+            self.iterator = None
+        else:
+            self.buffer = []
+            self.iterator = iter(tokens)
+        self.offset = 0
+        self.last_token = self.buffer[-1] if self.buffer else None
+
+    def fill(self, end: int) -> bool:
+        '''
+        Pull tokens until the one before `end` is buffered.
+        Returns false if the stream ends first.
+        '''
+        while self.offset + len(self.buffer) < end:
+            if self.iterator is None:
+                return False
+            token = next(self.iterator, None)
+            if token is None:
+                self.iterator = None
+                return False
+            self.buffer.append(token)
+            self.last_token = token
+        return True
+
+    def has(self, end: int) -> bool:
+        return end <= self.offset + len(self.buffer) or self.fill(end)
+
+    def last(self) -> Token:
+        '''
+        The last token pulled from the stream so far
+        '''
+        return self.last_token
+
+    def release(self, index: int):
+        '''
+        Forget tokens before `index`, they will not be looked at again.
+        '''
+        if self.iterator is not None and index > self.offset:
+            del self.buffer[:index - self.offset]
+            self.offset = index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self.fill(index.stop)
+            return self.buffer[index.start - self.offset:index.stop - self.offset]
+        elif index < 0:
+            return self.last_token
+        else:
+            self.fill(index + 1)
+            return self.buffer[index - self.offset]
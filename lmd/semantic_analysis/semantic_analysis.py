@@ -1,9 +1,15 @@
 from lmd.semantic_analysis.type_analyser import TypeAnalyser
 from lmd.ast.visitor import Visitor
+from lmd.util.symbol import SymbolTable
 
 
 class DefinitionSearcher(Visitor):
-    def __init__(self):
+    '''
+    Finds constant definitions, keyed by the symbol ids of their names
+    '''
+
+    def __init__(self, symbols: SymbolTable):
+        self.symbols = symbols
         self.definitions = {}
 
     def search(self, asts):
@@ -12,7 +18,7 @@ class DefinitionSearcher(Visitor):
         return self.definitions
 
     def visit_const_node(self, node):
-        self.definitions[node.name()] = node
+        self.definitions[self.symbols.of(node.names[0].token)] = node
 
 
 class Type:
@@ -152,13 +158,14 @@ class Context:
 
 
 class TypeAnalyser(Visitor):
-    def __init__(self, report):
+    def __init__(self, report, symbols: SymbolTable):
         self.type_variables = TypeVariables()
         self.context = Context()
         self.report = report
+        self.symbols = symbols
 
     def analyse(self, asts):
-        definitions = DefinitionSearcher().search(asts)
+        definitions = DefinitionSearcher(self.symbols).search(asts)
         self.context.push({name: Scheme([], self.type_variables.new())
                           for name in definitions
                            })
@@ -170,7 +177,7 @@ class TypeAnalyser(Visitor):
 
         for name in definitions:
             t = self.context.lookup(name)
-            print(name, ":", self.prettify(t))
+            print(self.symbols.text(name), ":", self.prettify(t))
 
     def prettify(self, t):
         params = self.free_variables(t)
@@ -190,19 +197,19 @@ class TypeAnalyser(Visitor):
     def get_type_of(self, name):
         result = self.context.lookup(name)
         if result is None:
-            print(f"unknown identifier {name}")
+            print(f"unknown identifier {self.symbols.text(name)}")
         else:
             return self.instantiate(result)
 
     def visit_qualified_identifier_node(self, node):
-        name = node.path[-1].token.text
+        name = self.symbols.of(node.path[-1].token)
         return self.get_type_of(name), Substitution()
 
     def visit_parenthesised_expression_node(self, node):
         return self.visit(node.expression)
 
     def visit_const_node(self, node):
-        args = [node.token.text for node in node.names[1:]]
+        args = [self.symbols.of(node.token) for node in node.names[1:]]
 
         arg_types = [self.type_variables.new() for _ in args]
         ctx = {}
@@ -295,5 +302,5 @@ class TypeAnalyser(Visitor):
         return []
 
 
-def analyse_semantics(asts, report):
-    TypeAnalyser(report).analyse(asts)
+def analyse_semantics(asts, report, symbols: SymbolTable):
+    TypeAnalyser(report, symbols).analyse(asts)
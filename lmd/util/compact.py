@@ -0,0 +1,177 @@
+'''
+Compact, column-wise storage for the tokens of one source
+'''
+
+from array import array
+from collections.abc import Sequence
+from typing import Iterable
+
+import bisect
+
+from lmd.util.source import Source, Span
+from lmd.util.token import Token, TokenKind
+
+
+class CompactTokens(Sequence):
+    '''
+    Tokens stored as parallel arrays of begin offsets, end offsets, kind
+    codes, trivia bounds and symbols, instead of a Token, a Span and a TokenKind
+    object per token. Offsets take four bytes unless the source is too long.
+
+    Kinds with equal attributes share one code. Per-token payloads, such as
+    literal values, are interned and only the tokens that have one store its
+    id, in arrays sorted by token position. Kinds with payloads are built
+    once per code and payload. Indexing returns a TokenView that behaves
+    like a Token.
+    '''
+
+    def __init__(self, source: Source):
+        offset_type = 'I' if source.len() <= 0xFFFFFFFF else 'Q'
+        self.source = source
+        self.begins = array(offset_type)
+        self.ends = array(offset_type)
+        self.codes = array('H')
+        self.leading = array(offset_type)
+        self.trailing = array(offset_type)
+        self.symbols = array('i')
+        self.texts = {}
+
+        self.payload_indices = array('I')
+        self.payload_ids = array('I')
+        self.payload_codes = {}
+        self.payload_table = []
+
+        self.kind_codes = {}
+        self.kind_table = []
+        self.payload_kinds = {}
+
+    def from_tokens(source: Source, tokens: Iterable[Token]) -> 'CompactTokens':
+        result = CompactTokens(source)
+        for token in tokens:
+            result.append(token)
+        return result
+
+    def append(self, token: Token):
+        kind = token.kind
+        index = len(self.codes)
+        self.begins.append(token.span.begin)
+        self.ends.append(token.span.end)
+        self.codes.append(self.kind_code(kind))
+        span = token.span
+        leading, trailing = token.leading_begin, token.trailing_end
+        self.leading.append(span.begin if leading is None else leading)
+        self.trailing.append(span.end if trailing is None else trailing)
+        self.symbols.append(-1 if token._symbol is None else token._symbol)
+        if kind.payload_attrs:
+            self.payload_indices.append(index)
+            self.payload_ids.append(self.payload_code(tuple(
+                getattr(kind, attr) for attr in kind.payload_attrs)))
+        if token._text is not None:
+            self.texts[index] = token._text
+
+    def kind_code(self, kind: TokenKind) -> int:
+        key = (type(kind),) + tuple(
+            value for attr, value in kind.kind_attrs().items()
+            if attr not in kind.payload_attrs)
+        code = self.kind_codes.get(key)
+        if code is None:
+            code = len(self.kind_table)
+            self.kind_codes[key] = code
+            self.kind_table.append(kind)
+        return code
+
+    def payload_code(self, payload: tuple) -> int:
+        try:
+            # Values of different types may be equal, e.g. 1 and 1.0
+            key = tuple((type(value), value) for value in payload)
+            code = self.payload_codes.get(key)
+        except TypeError:
+            key = code = None
+        if code is None:
+            code = len(self.payload_table)
+            if key is not None:
+                self.payload_codes[key] = code
+            self.payload_table.append(payload)
+        return code
+
+    def kind(self, index: int) -> TokenKind:
+        code = self.codes[index]
+        prototype = self.kind_table[code]
+        if not prototype.payload_attrs:
+            return prototype
+        payload = self.payload_ids[
+            bisect.bisect_left(self.payload_indices, index)]
+        kind = self.payload_kinds.get((code, payload))
+        if kind is None:
+            kind = object.__new__(type(prototype))
+            kind.__dict__.update(prototype.kind_attrs())
+            for attr, value in zip(prototype.payload_attrs,
+                                   self.payload_table[payload]):
+                setattr(kind, attr, value)
+            self.payload_kinds[code, payload] = kind
+        return kind
+
+    def span(self, index: int) -> Span:
+        return Span(self.source, self.begins[index], self.ends[index])
+
+    def text(self, index: int) -> str:
+        text = self.texts.get(index)
+        if text is None:
+            return self.source.slice(self.begins[index], self.ends[index])
+        return text
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TokenView(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("token index out of range")
+        return TokenView(self, index)
+
+
+class TokenView(Token):
+    '''
+    Token read on demand from a CompactTokens container
+    '''
+    __slots__ = ('tokens', 'index')
+
+    def __init__(self, tokens: CompactTokens, index: int):
+        self.tokens = tokens
+        self.index = index
+
+    @property
+    def span(self) -> Span:
+        return self.tokens.span(self.index)
+
+    @property
+    def kind(self) -> TokenKind:
+        return self.tokens.kind(self.index)
+
+    @property
+    def leading_begin(self) -> int:
+        return self.tokens.leading[self.index]
+
+    @property
+    def trailing_end(self) -> int:
+        return self.tokens.trailing[self.index]
+
+    @property
+    def _symbol(self) -> int:
+        symbol = self.tokens.symbols[self.index]
+        return None if symbol < 0 else symbol
+
+    @property
+    def symbol(self) -> int:
+        return self._symbol
+
+    @property
+    def _text(self) -> str:
+        return self.tokens.texts.get(self.index)
+
+    @property
+    def text(self) -> str:
+        return self.tokens.text(self.index)
@@ -17,14 +17,44 @@ class Error:
 
 
 class ErrorReport:
-    def __init__(self):
+    '''
+    Errors found by the phases of a compilation.
+
+    With `max_errors` set, errors past the budget are dropped. Phases check
+    `exhausted` to stop early and record where with `stop`.
+    '''
+
+    def __init__(self, max_errors: int = None):
         self.errors = []
+        self.max_errors = max_errors
+        self.stopped = False
 
     def add(self, error):
-        self.errors.append(error)
+        if not self.exhausted():
+            self.errors.append(error)
 
     def error(self, error):
-        self.errors.append(error)
+        self.add(error)
 
     def has_errors(self):
         return len(self.errors) > 0
+
+    def exhausted(self, pending: int = 0) -> bool:
+        '''
+        Whether the budget is used up, counting `pending` errors that are
+        yet to be added
+        '''
+        return self.max_errors is not None and \
+            len(self.errors) + pending >= self.max_errors
+
+    def stop(self, span: Span):
+        '''
+        Record that a phase stopped at `span` because the budget is exhausted.
+        The summary points at where the span begins, so stopping at a
+        whitespace or comment token does not quote all of its lines.
+        '''
+        if not self.stopped:
+            self.stopped = True
+            self.errors.append(Error(Message(
+                Span(span.source, span.begin, span.begin),
+                f"Too many errors, stopping after {self.max_errors}")))
@@ -1,23 +1,69 @@
+from array import array
 from dataclasses import dataclass
+from typing import Iterable, List, Tuple
 
 import bisect
+import mmap
+import re
+
+
+NEWLINE = re.compile('\n')
+BYTES_NEWLINE = re.compile(b'\n')
 
 
 class Source:
+    '''
+    Named source text.
+
+    The line index is built on first use, so sources that never produce
+    a diagnostic pay nothing for it. Lines are separated by '\n' only.
+    '''
+
     def __init__(self, name, text):
         self.name = name
         self.text = text
-
-        self.lines = self.text.splitlines()
-        self.line_lengths = [len(line) for line in self.lines]
-        self.prefix_sums = [0]
-        for line_length in self.line_lengths:
-            self.prefix_sums.append(line_length + self.prefix_sums[-1] + 1)
+        self._line_starts = None
+
+    def line_starts(self) -> array:
+        '''
+        Offsets at which lines begin, followed by one past the end of text
+        '''
+        if self._line_starts is None:
+            newline = NEWLINE if isinstance(self.text, str) else BYTES_NEWLINE
+            starts = array('q', [0])
+            starts.extend(map(re.Match.end, newline.finditer(self.text)))
+            starts.append(len(self.text) + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    @property
+    def prefix_sums(self) -> array:
+        return self.line_starts()
+
+    @property
+    def lines(self) -> 'Lines':
+        return Lines(self)
 
     def index_to_line_and_column(self, index):
-        line = bisect.bisect_right(self.prefix_sums, index) - 1
-        column = index - self.prefix_sums[line]
-        return line, column
+        starts = self.line_starts()
+        line = bisect.bisect_right(starts, index) - 1
+        return line, self.width(starts[line], index)
+
+    def indices_to_lines_and_columns(self, indices: Iterable[int]) -> List[Tuple[int, int]]:
+        '''
+        Line and column of every index, resolved in one sorted pass.
+        Each line is searched for from the line of the previous index.
+        '''
+        indices = list(indices)
+        starts = self.line_starts()
+        result = [None] * len(indices)
+        line = 0
+        for position in sorted(range(len(indices)), key=indices.__getitem__):
+            index = indices[position]
+            if starts[line + 1] <= index:
+                line = bisect.bisect_right(starts, index, line + 1) - 1
+            result[position] = (line, self.width(starts[line], index))
+        return result
 
     def split_span(self, begin, end):
         begin_line, begin_column = self.index_to_line_and_column(begin)
@@ -26,36 +72,124 @@ class Source:
         if begin_line == end_line:
             return [Span(self, begin, end)]
 
+        starts = self.line_starts()
         spans = []
-        spans.append(Span(self, begin, self.prefix_sums[begin_line + 1] - 1))
+        spans.append(Span(self, begin, starts[begin_line + 1] - 1))
         for line in range(begin_line + 1, end_line):
-            spans.append(
-                Span(self, self.prefix_sums[line], self.prefix_sums[line + 1] - 1))
-        spans.append(Span(self, self.prefix_sums[end_line], end))
+            spans.append(Span(self, starts[line], starts[line + 1] - 1))
+        spans.append(Span(self, starts[end_line], end))
         return spans
 
     def len(self):
         return len(self.text)
 
+    def slice(self, begin, end) -> str:
+        return self.text[begin:end]
+
+    def width(self, begin, end) -> int:
+        '''
+        Number of characters between two offsets
+        '''
+        return end - begin
+
     def __getitem__(self, index):
         return self.text[index]
 
+    def replace(self, begin, end, text):
+        '''
+        Replace `begin:end` of the text in place.
+        The source keeps its identity, so spans before `begin` stay valid.
+        '''
+        self.text = self.text[:begin] + text + self.text[end:]
+        self._line_starts = None
+
+    def close(self):
+        '''
+        Release what backs the text. Plain text holds nothing open.
+        '''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
     def from_file(path: str) -> 'Source':
         with open(path, 'r') as f:
             return Source(path, f.read())
 
 
+class MappedSource(Source):
+    '''
+    Source backed by raw UTF-8 bytes, usually a memory-mapped file.
+
+    Offsets in spans are byte offsets. Text is decoded only for the spans
+    that are read, so a source that lexes cleanly costs little more than
+    the mapping itself.
+    '''
+
+    def slice(self, begin, end) -> str:
+        return bytes(self.text[begin:end]).decode('utf-8', errors='replace')
+
+    def width(self, begin, end) -> int:
+        data = self.text[begin:end]
+        if data.isascii():
+            return len(data)
+        return len(bytes(data).decode('utf-8', errors='replace'))
+
+    def close(self):
+        '''
+        Unmap the file. Spans of the source can no longer be read after.
+        '''
+        if isinstance(self.text, mmap.mmap):
+            self.text.close()
+
+    def from_file(path: str) -> 'MappedSource':
+        with open(path, 'rb') as f:
+            if f.seek(0, 2) == 0:
+                return MappedSource(path, b'')
+            return MappedSource(path, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+class Lines:
+    '''
+    Lines of a source, sliced when indexed
+    '''
+
+    def __init__(self, source: Source):
+        self.source = source
+
+    def __len__(self):
+        return len(self.source.line_starts()) - 1
+
+    def __getitem__(self, line):
+        starts = self.source.line_starts()
+        line = self.source.slice(starts[line], starts[line + 1] - 1)
+        return line.removesuffix('\r')
+
+
 @dataclass
 class LineColumn:
     line: int
     column: int
 
 
-@dataclass
 class Span:
-    source: Source
-    begin: int
-    end: int
+    '''
+    Range of offsets in a source
+    '''
+    __slots__ = ('source', 'begin', 'end')
+
+    def __init__(self, source: Source, begin: int, end: int):
+        self.source = source
+        self.begin = begin
+        self.end = end
+
+    def __eq__(self, other):
+        if not isinstance(other, Span):
+            return NotImplemented
+        return self.source is other.source and \
+            (self.begin, self.end) == (other.begin, other.end)
 
     def __repr__(self):
         return f"{self.source.name}:{self.begin}:{self.end}"
@@ -63,14 +197,22 @@ class Span:
     def len(self):
         return self.end - self.begin
 
+    def width(self):
+        return self.source.width(self.begin, self.end)
+
     def split(self):
         return self.source.split_span(self.begin, self.end)
 
 
 def wrapping_span(spans):
-    begin = min(span.begin for span in spans)
-    end = max(span.end for span in spans)
-    return Span(spans[0].source, begin, end)
+    first = spans[0]
+    begin, end = first.begin, first.end
+    for span in spans:
+        if span.begin < begin:
+            begin = span.begin
+        if span.end > end:
+            end = span.end
+    return Span(first.source, begin, end)
 
 
 @dataclass
@@ -0,0 +1,41 @@
+'''
+Table of the identifiers, type names and operators interned in one compilation
+'''
+
+from typing import List
+
+
+class SymbolTable:
+    '''
+    Maps every distinct name to a small integer id and back.
+
+    Passes after cooking key their tables by symbol ids and compare names
+    by comparing ids, instead of hashing and comparing strings. Every
+    compilation has a table of its own, so ids are only meaningful within
+    it and the table is dropped with the compilation.
+    '''
+
+    def __init__(self):
+        self.ids = {}
+        self.texts: List[str] = []
+
+    def intern(self, text: str) -> int:
+        symbol = self.ids.get(text)
+        if symbol is None:
+            symbol = len(self.texts)
+            self.ids[text] = symbol
+            self.texts.append(text)
+        return symbol
+
+    def of(self, token) -> int:
+        '''
+        Symbol id of a token, interning its text if cooking did not
+        '''
+        symbol = token.symbol
+        return self.intern(token.text) if symbol is None else symbol
+
+    def text(self, symbol: int) -> str:
+        return self.texts[symbol]
+
+    def __len__(self):
+        return len(self.texts)
@@ -2,22 +2,104 @@
 Generic token i.e. segment of source code with some description
 '''
 
-from dataclasses import dataclass
-
 from lmd.util.source import Span
 
 
-class TokenKind:
+class KindBits:
+    '''
+    Bits assigned to kind classes and to the (attribute, value) pairs of
+    kinds that other kinds are matched against.
+
+    A kind used as a base in `extends` is compiled to a mask holding the bit
+    of its class and of each of its attributes. Every kind has a code with
+    the bits of all its classes and of its attributes that have bits, so
+    matching is a single integer test. Adding bits bumps the generation,
+    which makes kinds recompute their codes.
+    '''
+    bits = {}
+    generation = 0
+    class_codes = {}
+
+    def bit(key) -> int:
+        bit = KindBits.bits.get(key)
+        if bit is None:
+            bit = 1 << len(KindBits.bits)
+            KindBits.bits[key] = bit
+            KindBits.generation += 1
+        return bit
+
+    def class_code(cls) -> int:
+        cached = KindBits.class_codes.get(cls)
+        if cached is not None and cached[0] == KindBits.generation:
+            return cached[1]
+        code = 0
+        for base in cls.__mro__:
+            code |= KindBits.bits.get(base, 0)
+        KindBits.class_codes[cls] = (KindBits.generation, code)
+        return code
+
+
+class KindRegistry(type):
+    '''
+    Metaclass that makes kinds flyweights.
+
+    Constructing a kind without payload attributes returns the one shared
+    instance for its class and arguments, so the lexer, cooker and parser
+    do not allocate a new kind per token. Kinds with payload attributes,
+    such as literal values, are created per token.
+    '''
+    instances = {}
+
+    def __call__(cls, *args, **kwargs):
+        if cls.payload_attrs:
+            return super().__call__(*args, **kwargs)
+        key = (cls, args, tuple(kwargs.items()))
+        try:
+            kind = KindRegistry.instances.get(key)
+        except TypeError:
+            return super().__call__(*args, **kwargs)
+        if kind is None:
+            kind = super().__call__(*args, **kwargs)
+            KindRegistry.instances[key] = kind
+        return kind
+
+
+class TokenKind(metaclass=KindRegistry):
+    # Attributes that vary per token, e.g. the value of a literal
+    payload_attrs = ()
+
     def __init__(self, token_type):
         self.token_type = token_type
 
     def extends(self, base):
-        if not isinstance(self, type(base)):
-            return False
-        for attr, base_value in base.kind_attrs().items():
-            if getattr(self, attr) != base_value:
-                return False
-        return True
+        mask = base.__dict__.get('_mask')
+        if mask is None:
+            mask = base.base_mask()
+        return self.code() & mask == mask
+
+    def base_mask(self) -> int:
+        '''
+        Bits that a kind must have to extend this kind
+        '''
+        mask = KindBits.bit(type(self))
+        for pair in self.kind_attrs().items():
+            mask |= KindBits.bit(pair)
+        self._mask = mask
+        return mask
+
+    def code(self) -> int:
+        '''
+        Bits of the classes and attribute values of this kind
+        '''
+        if self.__dict__.get('_generation') == KindBits.generation:
+            return self._code
+        bits = KindBits.bits
+        code = KindBits.class_code(type(self))
+        for pair in self.__dict__.items():
+            code |= bits.get(pair, 0)
+        self._code = code
+        self._generation = KindBits.generation
+        return code
 
     def kind_attrs(self):
         '''
@@ -39,11 +121,80 @@ class TokenKind:
         return self.kind_attrs() == other.kind_attrs()
 
 
-@dataclass
 class Token:
-    span: Span
-    kind: TokenKind
-    text: str
+    '''
+    Token backed by a span of the shared source text.
+
+    The text is sliced from the source only when it is read, so tokens that
+    are dropped without looking at them never allocate a substring.
+    An explicit `text` overrides the source, e.g. for synthetic tokens.
+
+    Whitespace and comments around a significant token can be attached to
+    it as trivia: `leading_begin` is where its leading trivia begins and
+    `trailing_end` is where its trailing trivia ends.
+
+    Names and operators carry the id of their text in the symbol table of
+    the compilation. The cooker sets it, other tokens have none.
+    '''
+    __slots__ = ('span', 'kind', '_text', 'leading_begin', 'trailing_end',
+                 '_symbol')
+
+    def __init__(self, span: Span, kind: TokenKind, text: str = None):
+        self.span = span
+        self.kind = kind
+        self._text = text
+        self.leading_begin = None
+        self.trailing_end = None
+        self._symbol = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            return self.span.source.slice(self.span.begin, self.span.end)
+        return self._text
+
+    @property
+    def symbol(self) -> int:
+        return self._symbol
+
+    @symbol.setter
+    def symbol(self, symbol: int):
+        self._symbol = symbol
+
+    def with_kind(self, kind: TokenKind) -> 'Token':
+        '''
+        Same token with a different kind, still backed by the same span
+        '''
+        token = Token(self.span, kind, self._text)
+        token.leading_begin = self.leading_begin
+        token.trailing_end = self.trailing_end
+        token._symbol = self._symbol
+        return token
+
+    def leading_trivia(self) -> Span:
+        '''
+        Span of the whitespace and comments attached before the token
+        '''
+        span = self.span
+        begin = span.begin if self.leading_begin is None else self.leading_begin
+        return Span(span.source, begin, span.begin)
+
+    def trailing_trivia(self) -> Span:
+        '''
+        Span of the whitespace and comments attached after the token
+        '''
+        span = self.span
+        end = span.end if self.trailing_end is None else self.trailing_end
+        return Span(span.source, span.end, end)
+
+    def __eq__(self, other):
+        if not isinstance(other, Token):
+            return NotImplemented
+        return (self.span, self.kind, self.text) == \
+            (other.span, other.kind, other.text)
+
+    def __repr__(self):
+        return f'Token(span={self.span!r}, kind={self.kind!r}, text={self.text!r})'
 
     def __str__(self):
         return f'{self.span}: {self.kind} {repr(self.text)}'
@@ -1,7 +1,16 @@
+from contextlib import ExitStack
+
 from lmd.main import *
-from lmd.util.source import Source
+from lmd.util.source import Source, MappedSource
 
 arg_parser = args.default_arg_parser()
-src = arg_parser.parse_args().src
-srcs = [Source.from_file(src_file) for src_file in src]
-pipeline.interpret_sources(srcs)
+args = arg_parser.parse_args()
+if args.mmap and args.lexer != 'pattern':
+    arg_parser.error('--mmap requires the pattern lexer')
+source_type = MappedSource if args.mmap else Source
+with ExitStack() as sources:
+    srcs = [sources.enter_context(source_type.from_file(src_file))
+            for src_file in args.src]
+    pipeline.interpret_sources(srcs, lexer=args.lexer, mode=args.front_end,
+                               max_errors=args.max_errors or None,
+                               parser=args.parser)
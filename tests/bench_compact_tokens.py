@@ -0,0 +1,54 @@
+'''
+Compare memory of a list of cooked tokens with compact token storage.
+
+Run with `python3 -m tests.bench_compact_tokens [tokens]`.
+'''
+
+import sys
+import tracemalloc
+
+from lmd.util.compact import CompactTokens
+from lmd.util.error import ErrorReport
+from lmd.util.source import Source
+from lmd.lexing import pattern_lex
+from lmd.cooking import cook
+
+
+LINE = 'const f x = g (x + 12) "text" 3.5 -- comment\n'
+
+
+def cooked(src):
+    return cook.iter_cooked(pattern_lex.iter_source(src), ErrorReport())
+
+
+def retained_memory(build):
+    tracemalloc.start()
+    value = build()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, retained
+
+
+def main():
+    tokens = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    tokens_per_line = len(pattern_lex.lex_source(Source('line', LINE)))
+    src = Source('synthetic', LINE * (tokens // tokens_per_line))
+
+    token_list, list_memory = retained_memory(lambda: list(cooked(src)))
+    count = len(token_list)
+    del token_list
+
+    compact, compact_memory = retained_memory(
+        lambda: CompactTokens.from_tokens(src, cooked(src)))
+    assert len(compact) == count
+
+    print(f'{count} tokens')
+    print(f'  list:    {list_memory / 1e6:7.1f} MB, '
+          f'{list_memory / count:6.1f} B/token')
+    print(f'  compact: {compact_memory / 1e6:7.1f} MB, '
+          f'{compact_memory / count:6.1f} B/token')
+    print(f'  ratio:   {list_memory / compact_memory:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+'''
+Throughput of cooking raw tokens, in tokens per second.
+
+Run with `python3 -m tests.cooking.bench_cook`.
+'''
+
+import timeit
+
+from lmd.cooking import cook
+from lmd.lexing import pattern_lex
+from lmd.util.error import ErrorReport
+from lmd.util.source import Source
+
+from tests.main.common import synthetic_source
+
+
+def literal_source(rows: int) -> Source:
+    '''
+    Data-heavy source made mostly of number and string literals
+    '''
+    text = ''.join(
+        f'const row{i} = [{i}, {i % 100}, "name {i % 50}", "plain", '
+        f'0x{i:x}, {i}.5, "tab\\tted", 1000000]\n'
+        for i in range(rows))
+    return Source('literals', text)
+
+
+def main():
+    repeat = 5
+    sources = {
+        'program': synthetic_source,
+        'literals': literal_source,
+    }
+    for name, make_source in sources.items():
+        for size in [1_000, 10_000]:
+            tokens = pattern_lex.lex_source(make_source(size))
+            seconds = min(timeit.repeat(
+                lambda: cook.cook_tokens(tokens, ErrorReport()),
+                number=1, repeat=repeat))
+            print(f'{name:>8} {len(tokens):>8} tokens: {seconds * 1e3:7.1f} ms, '
+                  f'{len(tokens) / seconds / 1e6:5.2f} Mtokens/s')
+
+
+if __name__ == '__main__':
+    main()
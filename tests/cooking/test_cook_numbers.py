@@ -156,3 +156,11 @@ class TestCookNumbers(CookingTestCase):
         expected_tokens = [("0b3", cooked_token.Invalid())]
         expected_errors = [(0, lambda t: invalid_number_suffix(t, "3"))]
         self.assert_cooks_to(raw_tokens, expected_tokens, expected_errors)
+
+    def test_cooking_plain_decimal_integers(self):
+        raw_tokens = [("0", raw_token.Number(10)), ("007", raw_token.Number(10)),
+                      ("1234567890123", raw_token.Number(10))]
+        expected_tokens = [("0", cooked_token.Integer(10, 0)),
+                           ("007", cooked_token.Integer(10, 7)),
+                           ("1234567890123", cooked_token.Integer(10, 1234567890123))]
+        self.assert_cooks_to(raw_tokens, expected_tokens, [])
@@ -32,3 +32,17 @@ class TestCookStrings(CookingTestCase):
         expected_tokens = [(text, cooked_token.String(escaped_content))]
         expected_errors = [(0, unterminated_string)]
         self.assert_cooks_to(raw_tokens, expected_tokens, expected_errors)
+
+    def test_unknown_escapes_are_kept(self):
+        text = '"\\q\\\\q\\"'
+        raw_tokens = [(text, raw_token.String(True))]
+        expected_tokens = [(text, cooked_token.String('\\q\\q\\'))]
+        expected_errors = []
+        self.assert_cooks_to(raw_tokens, expected_tokens, expected_errors)
+
+    def test_equal_strings_share_kind(self):
+        raw_tokens = [('"abc"', raw_token.String(True)),
+                      ('"abc"', raw_token.String(True))]
+        expected_tokens = [('"abc"', cooked_token.String('abc')),
+                           ('"abc"', cooked_token.String('abc'))]
+        self.assert_cooks_to(raw_tokens, expected_tokens, [])
@@ -0,0 +1,99 @@
+import random
+import unittest
+
+from lmd.util.compact import CompactTokens
+from lmd.util.error import ErrorReport
+from lmd.util.source import *
+from lmd.lexing import raw_token, pattern_lex
+from lmd.cooking.cook import cook_tokens, iter_cooked_in_place
+from lmd.cooking.trivia import *
+
+
+TEXT = '''-- header
+const x = 1 -- one
+  {- two
+  -} + y {- same line -} * 2
+
+-- footer
+'''
+
+
+def significant(text):
+    src = Source('test', text)
+    tokens = list(attach_trivia(
+        cook_tokens(pattern_lex.lex_source(src), ErrorReport())))
+    return src, tokens
+
+
+def texts(tokens):
+    return [token.text for token in tokens]
+
+
+class TestTrivia(unittest.TestCase):
+    def test_trivia_is_dropped(self):
+        _, tokens = significant(TEXT)
+        self.assertEqual(texts(tokens), ['const', 'x', '=', '1', '+', 'y', '*', '2'])
+
+    def test_trivia_covers_whole_source(self):
+        src, tokens = significant(TEXT)
+        text = ''.join(
+            src.slice(token.leading_begin, token.trailing_end) for token in tokens)
+        self.assertEqual(text, TEXT)
+
+    def test_trailing_trivia_ends_after_line_break(self):
+        _, tokens = significant(TEXT)
+        one = tokens[3]
+        self.assertEqual(texts(trailing_trivia(one)), [' ', '-- one', '\n'])
+        plus = tokens[4]
+        self.assertEqual(texts(leading_trivia(plus)), ['  ', '{- two\n  -}', ' '])
+
+    def test_trivia_on_same_line_trails(self):
+        _, tokens = significant(TEXT)
+        y = tokens[5]
+        self.assertEqual(texts(trailing_trivia(y)), [' ', '{- same line -}', ' '])
+        self.assertEqual(texts(leading_trivia(tokens[6])), [])
+
+    def test_first_and_last_token_take_outer_trivia(self):
+        _, tokens = significant(TEXT)
+        self.assertEqual(texts(leading_trivia(tokens[0])), ['-- header', '\n'])
+        self.assertEqual(texts(trailing_trivia(tokens[-1])),
+                         ['\n\n', '-- footer', '\n'])
+
+    def test_recovered_trivia_is_raw_tokens(self):
+        _, tokens = significant(TEXT)
+        kinds = [token.kind for token in trailing_trivia(tokens[3])]
+        self.assertEqual(kinds, [raw_token.Whitespace(), raw_token.LineComment(),
+                                 raw_token.Whitespace()])
+
+    def test_only_trivia(self):
+        _, tokens = significant(' -- nothing\n')
+        self.assertEqual(tokens, [])
+
+    def test_in_place_cooking_reports_comment_errors(self):
+        src = Source('test', 'x {- open')
+        report = ErrorReport()
+        tokens = list(attach_trivia(
+            iter_cooked_in_place(pattern_lex.iter_source(src), report)))
+        self.assertEqual(texts(tokens), ['x'])
+        self.assertEqual(len(report.errors), 1)
+        self.assertEqual(tokens[0].trailing_end, src.len())
+
+    def test_compact_tokens_keep_trivia(self):
+        src, tokens = significant(TEXT)
+        compact = CompactTokens.from_tokens(src, tokens)
+        for token, view in zip(tokens, compact):
+            self.assertEqual(view.leading_trivia(), token.leading_trivia())
+            self.assertEqual(view.trailing_trivia(), token.trailing_trivia())
+
+    def test_random_trivia_covers_source(self):
+        rng = random.Random(0)
+        pieces = [' ', '\n', '-- c\n', '{- b -}', '{- \n -}', 'x', '1', '+', '\t']
+        for _ in range(200):
+            text = ''.join(rng.choice(pieces) for _ in range(rng.randrange(12)))
+            src, tokens = significant(text)
+            if not tokens:
+                continue
+            recovered = []
+            for token in tokens:
+                recovered += leading_trivia(token) + [token] + trailing_trivia(token)
+            self.assertEqual(''.join(texts(recovered)), text)
@@ -0,0 +1,64 @@
+'''
+Micro-benchmark of character classification for every token class.
+
+Compares skipping runs one character at a time with string predicates,
+as the lexer used to, against the table-driven run scanners, and times
+both lexers on input made of a single token class.
+
+Run with `python3 -m tests.lexing.bench_chars`.
+'''
+
+import timeit
+
+from lmd.lexing import lex, pattern_lex
+from lmd.lexing.chars import *
+from lmd.util.source import Source
+
+
+TOKEN_CLASSES = {
+    'whitespace': (SPACE, ' \t \n  ', lambda c: c in ' \t\r\n'),
+    'name': (NAME_CONTINUE, "name_with'quote9",
+             lambda c: c.isalpha() or c in "_'0123456789"),
+    'unicode name': (NAME_CONTINUE, 'zażółćgęśląjaźń',
+                     lambda c: c.isalpha() or c in "_'0123456789"),
+    'number': (NUMBER, '1234567890_abc',
+               lambda c: c in '_0123456789abcdefghijklmnopqrstuvwxyz'
+               'ABCDEFGHIJKLMNOPQRSTUVWXYZ'),
+    'operator': (OPERATOR, '+-*/%&|^~<=>$.', lambda c: c in '+-*/%&|^~<=>$.'),
+}
+
+
+def skip_with_predicate(text, predicate):
+    index = 0
+    while index < len(text) and predicate(text[index:index + 1]):
+        index += 1
+    return index
+
+
+def main():
+    repeat = 10
+    for name, (char_class, run, predicate) in TOKEN_CLASSES.items():
+        text = run * 1000
+        assert skip_with_predicate(text, predicate) == scan(text, 0, char_class)
+
+        predicate_time = timeit.timeit(
+            lambda: skip_with_predicate(text, predicate), number=repeat)
+        table_time = timeit.timeit(
+            lambda: scan(text, 0, char_class), number=repeat)
+
+        src = Source('bench', (run + ' ') * 2000)
+        lexers = {
+            lexer.__name__.split('.')[-1]: timeit.timeit(
+                lambda: lexer.lex_source(src), number=1)
+            for lexer in [lex, pattern_lex]
+        }
+
+        chars = len(text) * repeat
+        print(f'{name:>12}: predicate {chars / predicate_time / 1e6:7.2f} Mchar/s, '
+              f'table {chars / table_time / 1e6:7.2f} Mchar/s, '
+              + ', '.join(f'{lexer} lex {seconds * 1e3:6.1f} ms'
+                          for lexer, seconds in lexers.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''
+Time of re-lexing a one character edit as the file grows, against lexing
+the whole file again.
+
+Relex time should stay flat apart from editing the text itself, which
+copies the string: the tokens outside the damaged region are neither
+re-lexed nor copied. It should also stay flat over many edits scattered
+across the file.
+
+Run with `python3 -m tests.lexing.bench_relex`.
+'''
+
+import random
+import timeit
+
+from lmd.lexing import pattern_lex
+from lmd.lexing.incremental import Edit, Tokens, relex
+from lmd.lexing.raw_token import Name
+from lmd.util.source import Source
+
+from tests.main.common import synthetic_source
+
+
+SIZES = [100, 1_000, 10_000, 100_000]
+EDITS = 200
+
+SCATTERED_SIZE = 10_000
+BATCHES = 4
+
+
+def main():
+    for size in SIZES:
+        src = Source('bench', synthetic_source(size).text)
+        tokens = pattern_lex.lex_source(src)
+        full = min(timeit.repeat(lambda: pattern_lex.lex_source(src),
+                                 number=1, repeat=3))
+
+        # Insert a character in the middle of the file and delete it again
+        position = src.len() // 2
+        edits = [Edit(position, position, 'x'), Edit(position, position + 1, '')]
+
+        def relex_back_and_forth():
+            nonlocal tokens
+            for i in range(EDITS):
+                _, tokens = relex(tokens, src, edits[i % 2])
+
+        def edit_back_and_forth():
+            for i in range(EDITS):
+                edits[i % 2].apply(src)
+
+        relex_time = min(timeit.repeat(relex_back_and_forth, number=1, repeat=3))
+        edit_time = min(timeit.repeat(edit_back_and_forth, number=1, repeat=3))
+        print(f'{len(tokens):>9} tokens: full lex {full * 1e3:8.1f} ms, '
+              f'relex {relex_time / EDITS * 1e6:7.1f} us, '
+              f'of which text edit {edit_time / EDITS * 1e6:7.1f} us')
+
+    src = Source('bench', synthetic_source(SCATTERED_SIZE).text)
+    tokens = Tokens(pattern_lex.lex_source(src))
+    names = [token.span.begin for token in tokens if isinstance(token.kind, Name)]
+    rng = random.Random(0)
+    for batch in range(BATCHES):
+        # Prefix a random name with a character and delete it again
+        positions = [rng.choice(names) for _ in range(EDITS * 5)]
+        start = timeit.default_timer()
+        for position in positions:
+            _, tokens = relex(tokens, src, Edit(position, position, 'x'))
+            _, tokens = relex(tokens, src, Edit(position, position + 1, ''))
+        seconds = (timeit.default_timer() - start) / (2 * len(positions))
+        print(f'scattered edits {batch * len(positions) * 2:>5}+: '
+              f'relex {seconds * 1e6:7.1f} us')
+
+
+if __name__ == '__main__':
+    main()
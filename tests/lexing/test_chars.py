@@ -0,0 +1,67 @@
+import string
+import unittest
+
+from lmd.lexing.chars import *
+
+
+# Character rules as originally written with string predicates
+REFERENCE = {
+    SPACE: lambda c: c in " \t\r\n",
+    DIGIT: lambda c: c in "0123456789",
+    NAME_START: lambda c: c.isalpha() or c == "_" or c == "'",
+    NAME_CONTINUE: lambda c: c.isalpha() or c in "_'0123456789",
+    NUMBER: lambda c: c in "_" + string.digits + string.ascii_letters,
+    OPERATOR: lambda c: c in "+-*/%&|^~<=>$.",
+    DELIMITER: lambda c: c in "()[]{}",
+    SYMBOL: lambda c: c in "()[]{}:,;+-*/%&|^~<=>$.",
+}
+
+CHARACTERS = [chr(code) for code in range(0x3000)] + ['\U0001d49c', '\U0001f600']
+
+
+class TestChars(unittest.TestCase):
+    def test_classes_match_reference_rules(self):
+        for char_class, reference in REFERENCE.items():
+            for c in CHARACTERS:
+                self.assertEqual(is_in(c, char_class), reference(c),
+                                 (char_class, c))
+
+    def test_scan_stops_at_first_character_outside_class(self):
+        text = "ab_'9é²x"
+        self.assertEqual(scan(text, 0, NAME_CONTINUE), 6)
+        self.assertEqual(scan(" \t\r\nx", 0, SPACE), 4)
+        self.assertEqual(scan("+-*/x", 1, OPERATOR), 4)
+        self.assertEqual(scan("abc", 3, NAME_CONTINUE), 3)
+
+    def test_scan_matches_reference_rules(self):
+        for char_class, reference in REFERENCE.items():
+            text = ''.join(CHARACTERS)
+            index = 0
+            while index < len(text):
+                end = index
+                while end < len(text) and reference(text[end]):
+                    end += 1
+                self.assertEqual(scan(text, index, char_class), end)
+                index = end + 1
+
+    def test_scan_number_takes_dot_before_number_character(self):
+        self.assertEqual(scan_number('1_2.3_4', 0), 7)
+        self.assertEqual(scan_number('1.', 0), 1)
+        self.assertEqual(scan_number('1..2', 0), 1)
+        self.assertEqual(scan_number('1.a.b+', 0), 5)
+
+    def test_scan_number_takes_dot_in_bytes(self):
+        self.assertEqual(scan_number(b'1_2.3_4', 0), 7)
+        self.assertEqual(scan_number(b'1.', 0), 1)
+        self.assertEqual(scan_number(b'1.a.b+', 0), 5)
+
+    def test_scan_takes_non_ascii_runs_up_to_first_non_letter(self):
+        for text in ['zażółć gęślą', 'αβγ_1δ²ε', "x'é\U0001d49c€y", '1é']:
+            for char_class in [NAME_START, NAME_CONTINUE]:
+                for index in range(len(text)):
+                    end = index
+                    while (end < len(text)
+                           and REFERENCE[char_class](text[end])):
+                        end += 1
+                    self.assertEqual(scan(text, index, char_class), end,
+                                     (text, char_class, index))
@@ -57,3 +57,20 @@ class TestLexComments(unittest.TestCase):
         expected = [Token(Span(src, 0, len(text)), BlockComment(False), text)]
         actual = lex_source(src)
         self.assertEqual(actual, expected)
+
+    def test_lex_block_comment_followed_by_code(self):
+        text = '{- a {- b -} c -}x'
+        src = make_src(text)
+        expected = [Token(Span(src, 0, 17), BlockComment(True), text[:17]),
+                    Token(Span(src, 17, 18), Name(), 'x')]
+        actual = lex_source(src)
+        self.assertEqual(actual, expected)
+
+    def test_lex_line_comment_stops_at_newline(self):
+        text = '-- comment\nx'
+        src = make_src(text)
+        expected = [Token(Span(src, 0, 10), LineComment(), '-- comment'),
+                    Token(Span(src, 10, 11), Whitespace(), '\n'),
+                    Token(Span(src, 11, 12), Name(), 'x')]
+        actual = lex_source(src)
+        self.assertEqual(actual, expected)
@@ -0,0 +1,135 @@
+import random
+import unittest
+from unittest import mock
+
+from lmd.lexing import incremental, lex, pattern_lex
+from lmd.lexing.incremental import Edit, Tokens, relex
+from lmd.util.source import *
+
+
+TEXT = '''const x = 1.5 + y -- comment
+{- block {- nested -} still -}
+const s = "a \\" b" ++ 0x1F
+mod M { pub const f a = a }
+'''
+
+
+class CountingLexer:
+    def __init__(self, lexer):
+        self.lexer = lexer
+        self.count = 0
+
+    def iter_source(self, src, index=0):
+        for token in self.lexer.iter_source(src, index):
+            self.count += 1
+            yield token
+
+
+class TestLexIncremental(unittest.TestCase):
+    def assert_relexes(self, text, edit, lexer=pattern_lex):
+        src = Source('test', text)
+        expected = Source('test', text)
+        edit.apply(expected)
+        tokens = lexer.lex_source(src)
+        new_src, actual = relex(tokens, src, edit, lexer)
+        self.assertIs(new_src, src)
+        self.assertEqual(src.text, expected.text)
+        self.assertEqual(list(actual), lexer.lex_source(src), (text, edit))
+
+    def test_relex_insert_into_name(self):
+        self.assert_relexes(TEXT, Edit(7, 7, 'yz'))
+
+    def test_relex_joins_number_parts(self):
+        self.assert_relexes('x = 1. + 2', Edit(6, 6, '5'))
+
+    def test_relex_opening_block_comment_swallows_rest(self):
+        self.assert_relexes(TEXT, Edit(0, 0, '{-'))
+
+    def test_relex_closing_nested_block_comment(self):
+        self.assert_relexes(TEXT, Edit(38, 38, ' -} '))
+
+    def test_relex_removing_block_comment_end(self):
+        end = TEXT.index('still -}') + len('still ')
+        self.assert_relexes(TEXT, Edit(end, end + 2, ''))
+
+    def test_relex_unterminated_string(self):
+        self.assert_relexes(TEXT, Edit(TEXT.index('"a'), TEXT.index('"a') + 1, ''))
+
+    def test_relex_opening_string(self):
+        self.assert_relexes(TEXT, Edit(10, 10, '"'))
+
+    def test_relex_at_end(self):
+        self.assert_relexes(TEXT, Edit(len(TEXT), len(TEXT), 'const z = 0'))
+
+    def test_relex_empty_source(self):
+        self.assert_relexes('', Edit(0, 0, 'x'))
+
+    def test_relex_delete_everything(self):
+        self.assert_relexes(TEXT, Edit(0, len(TEXT), ''))
+
+    def test_relex_random_edits(self):
+        rng = random.Random(0)
+        pieces = ['{-', '-}', '"', '\\', '--', '\n', ' ', 'x', '1', '.', '+']
+        for _ in range(300):
+            begin = rng.randrange(len(TEXT) + 1)
+            end = min(len(TEXT), begin + rng.randrange(4))
+            text = ''.join(rng.choice(pieces) for _ in range(rng.randrange(3)))
+            for lexer in [pattern_lex, lex]:
+                self.assert_relexes(TEXT, Edit(begin, end, text), lexer)
+
+    def test_relex_only_lexes_near_edit(self):
+        text = TEXT * 200
+        src = Source('test', text)
+        tokens = pattern_lex.lex_source(src)
+        lexer = CountingLexer(pattern_lex)
+        position = len(text) // 2
+        relex(tokens, src, Edit(position, position, ' '), lexer)
+        self.assertLess(lexer.count, 5)
+
+    def assert_repeated_edits_relex(self, src, pieces):
+        rng = random.Random(1)
+        tokens = pattern_lex.lex_source(src)
+        for _ in range(300):
+            begin = rng.randrange(src.len() + 1)
+            end = min(src.len(), begin + rng.randrange(4))
+            text = ''.join(rng.choice(pieces) for _ in range(rng.randrange(3)))
+            _, tokens = relex(tokens, src, Edit(begin, end, text))
+            expected = pattern_lex.lex_source(src)
+            self.assertEqual(list(tokens), expected)
+            self.assertEqual([tokens[i] for i in range(-len(tokens), 0)], expected)
+        return tokens
+
+    def test_relex_repeated_edits(self):
+        pieces = ['{-', '-}', '"', '--', '\n', ' ', 'x', '1', '.', 'const ']
+        self.assert_repeated_edits_relex(Source('test', TEXT * 3), pieces)
+
+    def test_relex_repeated_edits_across_chunks(self):
+        pieces = ['{-', '-}', '"', '--', '\n', ' ', 'x', '1', '.', TEXT]
+        with mock.patch.object(incremental, 'CHUNK', 4):
+            self.assert_repeated_edits_relex(Source('test', TEXT * 3), pieces)
+
+    def test_relex_cost_does_not_grow_with_edits(self):
+        pieces = [' ', 'x', '1', '\n']
+        src = Source('test', TEXT * 30)
+        chunks = len(Tokens(pattern_lex.lex_source(src)).chunks)
+        tokens = self.assert_repeated_edits_relex(src, pieces)
+        self.assertLessEqual(len(tokens.chunks), chunks)
+
+    def test_relex_keeps_untouched_tokens(self):
+        src = Source('test', TEXT * 20)
+        tokens = pattern_lex.lex_source(src)
+        before = list(tokens)
+        position = src.len() // 2
+        _, actual = relex(tokens, src, Edit(position, position, ' '))
+        self.assertIsInstance(actual, Tokens)
+        self.assertIs(actual[0], before[0])
+        self.assertIs(actual.chunks[-1][-1], before[-1])
+        self.assertEqual(actual[-1].span.begin, before[-1].span.begin + 1)
+
+    def test_relex_rewrites_given_list(self):
+        src = Source('test', 'a b c d')
+        tokens = pattern_lex.lex_source(src)
+        _, actual = relex(tokens, src, Edit(0, 0, 'xyz '))
+        self.assertEqual([token.text for token in tokens],
+                         ['xyz', ' ', 'a', ' ', 'b', ' ', 'c', ' ', 'd'])
+        self.assertEqual(tokens, list(actual))
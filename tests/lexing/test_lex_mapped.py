@@ -0,0 +1,76 @@
+import os
+import random
+import tempfile
+import unittest
+
+from lmd.lexing import pattern_lex
+from lmd.util.source import *
+
+from .test_lex_pattern import EDGE_CASES
+
+
+TEXT = '''const ż = "ąę \\" x" -- komentarz ✓
+{- blok {- ☃ -} -} x² 1.5 ¤ 0x1F
+mod M { pub const f a = a }'''
+
+
+def described(tokens):
+    return [(token.kind, token.text) for token in tokens]
+
+
+class TestLexMapped(unittest.TestCase):
+    def assert_same_tokens(self, text):
+        src = Source('test', text)
+        mapped = MappedSource('test', text.encode('utf-8'))
+        expected = pattern_lex.lex_source(src)
+        actual = pattern_lex.lex_source(mapped)
+        self.assertEqual(described(actual), described(expected), repr(text))
+
+        for old, new in zip(expected, actual):
+            self.assertEqual(
+                mapped.index_to_line_and_column(new.span.begin),
+                src.index_to_line_and_column(old.span.begin))
+            self.assertEqual(new.span.width(), old.span.len())
+
+    def test_mapped_source_lexes_like_text_source(self):
+        self.assert_same_tokens(TEXT)
+
+    def test_mapped_source_edge_cases(self):
+        for text in EDGE_CASES:
+            self.assert_same_tokens(text)
+
+    def test_mapped_source_random_input(self):
+        alphabet = ' \t\n"\\-{}()+=._\'0129abxé²ż☃?'
+        rng = random.Random(0)
+        for _ in range(300):
+            length = rng.randrange(30)
+            self.assert_same_tokens(
+                ''.join(rng.choice(alphabet) for _ in range(length)))
+
+    def test_invalid_utf8_is_unknown(self):
+        src = MappedSource('test', b'a \xff b')
+        tokens = pattern_lex.lex_source(src)
+        self.assertEqual([token.text for token in tokens],
+                         ['a', ' ', '\ufffd', ' ', 'b'])
+
+    def test_mapped_lines(self):
+        src = MappedSource('test', 'ab\r\nżółw\n\nx'.encode('utf-8'))
+        self.assertEqual([src.lines[i] for i in range(len(src.lines))],
+                         ['ab', 'żółw', '', 'x'])
+        self.assertEqual(src.index_to_line_and_column(len('ab\r\nżó'.encode())),
+                         (1, 2))
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.lmd')
+            with open(path, 'wb') as f:
+                f.write(TEXT.encode('utf-8'))
+            with MappedSource.from_file(path) as src:
+                self.assertEqual(
+                    described(pattern_lex.lex_source(src)),
+                    described(pattern_lex.lex_source(Source('test', TEXT))))
+            self.assertTrue(src.text.closed)
+
+            with open(path, 'wb'):
+                pass
+            self.assertEqual(pattern_lex.lex_source(MappedSource.from_file(path)), [])
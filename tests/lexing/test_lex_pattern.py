@@ -0,0 +1,84 @@
+import random
+import unittest
+from unittest import mock
+
+from lmd.lexing import lex, pattern_lex
+from lmd.util.source import *
+
+from . import test_lex_comments
+from . import test_lex_names
+from . import test_lex_numbers
+from . import test_lex_strings
+from . import test_lex_symbols
+from . import test_lex_whitespace
+
+
+CORPUS = [
+    test_lex_comments,
+    test_lex_names,
+    test_lex_numbers,
+    test_lex_strings,
+    test_lex_symbols,
+    test_lex_whitespace,
+]
+
+EDGE_CASES = [
+    '',
+    'a\r\nb',
+    'x\x0by',
+    'ąęść żółw',
+    'ab\u00e9c x\u00b2',
+    '"\\\\"',
+    '"\\q"',
+    '"\\',
+    '1.',
+    '1..2',
+    '0x',
+    '0b101.1',
+    '0X12',
+    '{-}',
+    '{-{--}',
+    '-{- a -}-',
+    '+--x',
+    '{- -} -} {-',
+    "'a' _b",
+    '1.a.b',
+]
+
+
+class TestLexPattern(unittest.TestCase):
+    def assert_same_tokens(self, text):
+        src = Source('test', text)
+        self.assertEqual(pattern_lex.lex_source(src), lex.lex_source(src),
+                         repr(text))
+
+    def test_pattern_lexer_agrees_on_lexing_corpus(self):
+        inputs = []
+
+        def differential_lex_source(src):
+            inputs.append(src.text)
+            return pattern_lex.lex_source(src)
+
+        for module in CORPUS:
+            suite = unittest.defaultTestLoader.loadTestsFromModule(module)
+            result = unittest.TestResult()
+            with mock.patch.object(module, 'lex_source', differential_lex_source):
+                suite.run(result)
+            self.assertTrue(result.wasSuccessful(),
+                            result.failures + result.errors)
+
+        self.assertTrue(inputs)
+        for text in inputs:
+            self.assert_same_tokens(text)
+
+    def test_pattern_lexer_agrees_on_edge_cases(self):
+        for text in EDGE_CASES:
+            self.assert_same_tokens(text)
+
+    def test_pattern_lexer_agrees_on_random_input(self):
+        alphabet = ' \t\n\r"\\-{}()[]:,;+*/%&|^~<=>$._\'0123456789abxoXFé²?'
+        rng = random.Random(0)
+        for _ in range(500):
+            length = rng.randrange(40)
+            text = ''.join(rng.choice(alphabet) for _ in range(length))
+            self.assert_same_tokens(text)
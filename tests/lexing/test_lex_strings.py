@@ -65,3 +65,19 @@ class TestLexStrings(unittest.TestCase):
         expected = [Token(Span(src, 0, len(text)), String(False), '"a\\"')]
         actual = lex_source(src)
         self.assertEqual(actual, expected)
+
+    def test_lex_string_with_unknown_escape(self):
+        text = '"a\\qb" x'
+        src = make_src(text)
+        expected = [Token(Span(src, 0, 6), String(True), '"a\\qb"'),
+                    Token(Span(src, 6, 7), Whitespace(), ' '),
+                    Token(Span(src, 7, 8), Name(), 'x')]
+        actual = lex_source(src)
+        self.assertEqual(actual, expected)
+
+    def test_lex_string_ending_with_backslash(self):
+        text = '"a\\'
+        src = make_src(text)
+        expected = [Token(Span(src, 0, len(text)), String(False), text)]
+        actual = lex_source(src)
+        self.assertEqual(actual, expected)
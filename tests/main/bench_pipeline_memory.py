@@ -0,0 +1,42 @@
+'''
+Compare peak memory of the front end modes of the pipeline.
+
+Run with `python3 -m tests.main.bench_pipeline_memory`.
+'''
+
+import time
+import tracemalloc
+
+from lmd.main import pipeline
+from lmd.util.error import ErrorReport
+
+from .common import synthetic_source
+
+
+def measure(phases, src):
+    report = ErrorReport()
+    tracemalloc.start()
+    begin = time.perf_counter()
+    value = [src]
+    for phase in phases:
+        value = phase(value, report)
+    elapsed = time.perf_counter() - begin
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert not report.has_errors()
+    return peak, retained, elapsed
+
+
+def main():
+    for statements in [500, 2_000]:
+        src = synthetic_source(statements)
+        print(f'{statements} statements, {len(src.text) / 1e3:.0f} kB')
+        for mode in pipeline.FRONT_ENDS:
+            peak, retained, elapsed = measure(pipeline.front_end(mode=mode), src)
+            print(f'  {mode:>10}: peak {peak / 1e6:6.1f} MB, '
+                  f'above AST {(peak - retained) / 1e6:6.1f} MB, '
+                  f'{elapsed:6.2f} s')
+
+
+if __name__ == '__main__':
+    main()
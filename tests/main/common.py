@@ -0,0 +1,23 @@
+import os
+
+from lmd.util.source import Source
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+# Example programs at the root of the repository
+EXAMPLES = [os.path.join(ROOT, name) for name in ['a.lmd', 'b.lmd', 'ski.lmd']]
+
+STATEMENT = '''
+{{- statement {index} -}}
+const f{index} x y = (x + {index}) * y -- scaled
+pub const g{index} = if f{index} 1 2 then "yes" else 0x{index:x}
+'''
+
+
+def synthetic_source(statements: int) -> Source:
+    '''
+    Generate a large program with comments, literals and nested expressions.
+    '''
+    text = ''.join(STATEMENT.format(index=i) for i in range(statements))
+    return Source('synthetic', text)
@@ -0,0 +1,131 @@
+import unittest
+
+from lmd.main import pipeline
+from lmd.util.error import Error, ErrorReport, Message
+from lmd.util.source import Source, Span
+
+from .common import synthetic_source
+
+
+SOURCES = [
+    'const x = 1 + 2 -- fine',
+    'const x = 1.5u + 0x1.f + 0b',
+    'const s = "unterminated',
+    'const x = ? ¤ 1 {- unterminated',
+    'const f x = 12abc 1.2.3',
+    'mod M { pub const x = 1 ? }',
+    'const = = 3',
+]
+
+
+# The stream front end is left out of the comparison with cooking errors:
+# it cooks only the tokens the parser reaches, so it may stop before
+# reporting every cooking error. It is compared on parse errors alone.
+
+PARSE_ERROR_SOURCES = [
+    'const = = 3',
+    'const x = (1',
+    'mod M { const y = }',
+    'const x = if a then b',
+    'use M.',
+    '+ const x = 1',
+]
+
+
+def run_phases(phases, srcs, report):
+    value = srcs
+    for phase in phases:
+        value = phase(value, report)
+    return value
+
+
+def run(phases, src):
+    report = ErrorReport()
+    value = run_phases(phases, [src], report)
+    return value, report.errors
+
+
+class TestFrontEnds(unittest.TestCase):
+    def assert_front_ends_agree(self, src):
+        expected = run(pipeline.front_end(mode='list'), src)
+        for mode in ['list', 'compact', 'fused']:
+            for lexer in pipeline.LEXERS:
+                for parser in pipeline.PARSERS:
+                    actual = run(pipeline.front_end(lexer, mode, parser), src)
+                    self.assertEqual(actual, expected,
+                                     (mode, lexer, parser, src.text))
+
+    def test_front_ends_agree_on_valid_program(self):
+        self.assert_front_ends_agree(synthetic_source(20))
+
+    def test_front_ends_report_same_errors(self):
+        for text in SOURCES:
+            self.assert_front_ends_agree(Source('test', text))
+
+    def assert_stream_agrees(self, srcs):
+        expected_report = ErrorReport()
+        expected = run_phases(pipeline.front_end(mode='list'), srcs,
+                              expected_report)
+        for lexer in pipeline.LEXERS:
+            for parser in pipeline.PARSERS:
+                report = ErrorReport()
+                actual = run_phases(pipeline.front_end(lexer, 'stream', parser),
+                                    srcs, report)
+                self.assertEqual(actual, expected, (lexer, parser))
+                self.assertEqual(report.errors, expected_report.errors,
+                                 (lexer, parser))
+
+    def test_stream_front_end_parses_like_list(self):
+        self.assert_stream_agrees([synthetic_source(20)])
+        self.assert_stream_agrees([synthetic_source(5), Source('b', 'const y = 1'),
+                                   Source('empty', ' -- nothing\n'),
+                                   Source('c', 'mod M { pub const z = y }')])
+
+    def test_stream_front_end_reports_same_parse_errors(self):
+        for text in PARSE_ERROR_SOURCES:
+            self.assert_stream_agrees([Source('test', text)])
+        self.assert_stream_agrees([Source(str(i), text)
+                                   for i, text in enumerate(PARSE_ERROR_SOURCES)])
+
+    def test_error_budget_stops_front_ends(self):
+        src = Source('test', '? ' * 1000)
+        for mode in ['list', 'compact', 'fused']:
+            report = ErrorReport(max_errors=5)
+            value = [src]
+            for phase in pipeline.front_end(mode=mode):
+                value = phase(value, report)
+            self.assertEqual(len(report.errors), 6, mode)
+            self.assertTrue(report.stopped)
+            self.assertEqual(report.errors[-1].reason.span.begin, 9)
+
+    def test_error_budget_spans_sources(self):
+        srcs = [Source('bad', 'const x = 0x\n'), Source('good', 'const y = 1\n')]
+        for mode in pipeline.FRONT_ENDS:
+            for parser in pipeline.PARSERS:
+                report = ErrorReport(max_errors=1)
+                value = run_phases(pipeline.front_end(mode=mode, parser=parser),
+                                   srcs, report)
+                self.assertIsNone(value[1], (mode, parser))
+                self.assertEqual(len(report.errors), 2, (mode, parser))
+                self.assertTrue(report.stopped)
+
+    def test_error_budget_stops_parsing(self):
+        src = Source('test', 'const x = 1 const y = 2')
+        [tokens] = run_phases(pipeline.front_end()[:-1], [src], ErrorReport())
+        for name, parser in pipeline.PARSERS.items():
+            report = ErrorReport(max_errors=1)
+            report.add(Error(Message(Span(src, 0, 1), 'earlier')))
+            program = parser.parse_tokens(tokens, report)
+            self.assertEqual(program.statements, [], name)
+            self.assertEqual(report.errors[-1].reason.span.begin, 0, name)
+
+    def test_sources_without_tokens_parse_to_empty_programs(self):
+        srcs = [Source('empty', ''), Source('comment', ' -- nothing\n')]
+        for mode in pipeline.FRONT_ENDS:
+            for parser in pipeline.PARSERS:
+                report = ErrorReport()
+                value = run_phases(pipeline.front_end(mode=mode, parser=parser),
+                                   srcs, report)
+                self.assertEqual([program.statements for program in value],
+                                 [[], []], (mode, parser))
+                self.assertFalse(report.has_errors(), (mode, parser))
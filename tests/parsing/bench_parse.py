@@ -0,0 +1,34 @@
+'''
+Throughput of parsing cooked tokens, in tokens per second.
+
+Run with `python3 -m tests.parsing.bench_parse`.
+'''
+
+import timeit
+
+from lmd.main import pipeline
+from lmd.parsing import compiler, parse
+from lmd.parsing.memo import Memo
+from lmd.util.error import ErrorReport
+
+from tests.main.common import synthetic_source
+
+
+def main():
+    repeat = 5
+    for size in [100, 1_000]:
+        [tokens] = pipeline.run_pipeline(
+            [synthetic_source(size)], pipeline.front_end()[:-1])
+        parsers = {
+            'plain': lambda: parse.parse_tokens(tokens, ErrorReport()),
+            'packrat': lambda: parse.parse_tokens(tokens, ErrorReport(), Memo()),
+            'compiled': lambda: compiler.parse_tokens(tokens, ErrorReport()),
+        }
+        for name, parse_once in parsers.items():
+            seconds = min(timeit.repeat(parse_once, number=1, repeat=repeat))
+            print(f'{name:>8} {len(tokens):>8} tokens: {seconds * 1e3:7.1f} ms, '
+                  f'{len(tokens) / seconds / 1e6:5.2f} Mtokens/s')
+
+
+if __name__ == '__main__':
+    main()
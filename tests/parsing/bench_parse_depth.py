@@ -0,0 +1,56 @@
+'''
+Parse time per nesting level of deeply nested expressions.
+
+The recursive parsers need a raised recursion limit and a large thread
+stack to reach these depths, the stackless parser runs with the defaults.
+
+Run with `python3 -m tests.parsing.bench_parse_depth`.
+'''
+
+import sys
+import threading
+import timeit
+
+from lmd.main import pipeline
+from lmd.util.error import ErrorReport
+from lmd.util.source import Source
+
+
+SHAPES = {
+    'parens': lambda n: 'const x = ' + '(' * n + 'a' + ')' * n,
+    'ifs': lambda n: 'const x = ' + 'if a then ' * n + 'a' + ' else a' * n,
+    'fns': lambda n: 'const x = ' + 'fn a => ' * n + 'a',
+}
+
+DEPTHS = [1_000, 4_000, 16_000]
+
+
+def bench(name, parser, tokens, depth):
+    seconds = min(timeit.repeat(
+        lambda: parser.parse_tokens(tokens, ErrorReport()),
+        number=1, repeat=3))
+    return f'{name:>11}: {seconds * 1e3:7.1f} ms, {seconds / depth * 1e6:6.2f} us per level'
+
+
+def main():
+    for shape, make_text in SHAPES.items():
+        for depth in DEPTHS:
+            [tokens] = pipeline.run_pipeline(
+                [Source(shape, make_text(depth))], pipeline.front_end()[:-1])
+            for name, parser in pipeline.PARSERS.items():
+                if name == 'stackless':
+                    line = bench(name, parser, tokens, depth)
+                else:
+                    lines = []
+                    thread = threading.Thread(target=lambda: lines.append(
+                        bench(name, parser, tokens, depth)))
+                    thread.start()
+                    thread.join()
+                    line = lines[0]
+                print(f'{shape:>6} {depth:>6} {line}')
+
+
+if __name__ == '__main__':
+    sys.setrecursionlimit(1_000_000)
+    threading.stack_size(1 << 29)
+    main()
@@ -0,0 +1,49 @@
+'''
+Parse time against input size. Linear parsing keeps the time per
+statement, term or nesting level flat as the input grows.
+
+Run with `python3 -m tests.parsing.bench_parse_scaling`.
+'''
+
+import sys
+import timeit
+
+from lmd.main import pipeline
+from lmd.parsing import compiler, parse
+from lmd.util.error import ErrorReport
+from lmd.util.source import Source
+
+
+SHAPES = {
+    # Many top-level statements
+    'statements': lambda n: 'const x = f 1 + 2\n' * n,
+    # One long application chain
+    'terms': lambda n: 'const x = ' + 'a ' * n,
+    # Unclosed parentheses, each level reports an error
+    'unclosed': lambda n: 'const x = ' + '(a ' * n,
+}
+
+SIZES = {
+    'statements': [2_500, 5_000, 10_000, 20_000],
+    'terms': [5_000, 10_000, 20_000, 40_000],
+    'unclosed': [250, 500, 1_000, 2_000],
+}
+
+
+def main():
+    sys.setrecursionlimit(100_000)
+    repeat = 3
+    for shape, make_text in SHAPES.items():
+        for size in SIZES[shape]:
+            [tokens] = pipeline.run_pipeline(
+                [Source(shape, make_text(size))], pipeline.front_end()[:-1])
+            for name, parser in pipeline.PARSERS.items():
+                seconds = min(timeit.repeat(
+                    lambda: parser.parse_tokens(tokens, ErrorReport()),
+                    number=1, repeat=repeat))
+                print(f'{shape:>10} {size:>6} {name:>11}: {seconds * 1e3:7.1f} ms, '
+                      f'{seconds / size * 1e6:6.2f} us per unit')
+
+
+if __name__ == '__main__':
+    main()
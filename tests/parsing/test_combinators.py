@@ -0,0 +1,83 @@
+import unittest
+
+from lmd.cooking.tokens import *
+from lmd.parsing.cursor import Cursor
+from lmd.parsing.combinators import *
+from lmd.parsing.parse import ParseKind
+
+from .common import *
+
+
+TOKENS = [
+    ('A', Type()),
+    ('.', Symbol(SymbolType.DOT)),
+    ('x', Identifier()),
+]
+
+
+class TestCombinators(unittest.TestCase):
+    def test_cursor_mark_and_reset(self):
+        cursor = Cursor(make_tokens(TOKENS))
+        mark = cursor.mark()
+        cursor.take(2)
+        self.assertEqual(cursor.peek_one().text, 'x')
+        cursor.reset(mark)
+        self.assertEqual(cursor.peek_one().text, 'A')
+
+    def test_backtracked_alternative_rewinds_shared_cursor(self):
+        cursor = Cursor(make_tokens(TOKENS))
+        parser = (ParseKind(Type()) + ParseKind(Identifier())) \
+            | (ParseKind(Type()) + ParseKind(Symbol(SymbolType.DOT)))
+        result = parser.parse(cursor)
+        self.assertEqual(result.state, ParsingState.OK)
+        self.assertEqual(result.position, 2)
+        self.assertEqual(cursor.index, 2)
+
+    def test_repeat_stops_at_last_complete_repetition(self):
+        cursor = Cursor(make_tokens(TOKENS))
+        parser = Repeat(ParseKind(Type()) + ParseKind(Symbol(SymbolType.DOT))) \
+            + ParseKind(Identifier())
+        result = parser.parse(cursor)
+        self.assertEqual(result.state, ParsingState.OK)
+        self.assertEqual(len(result.values), 3)
+        self.assertEqual(result.position, 3)
+
+    def test_first_kinds(self):
+        qualified = Repeat(ParseKind(Type()) + ParseKind(Symbol(SymbolType.DOT))) \
+            + ParseKind(Identifier())
+        self.assertEqual(qualified.first(), [Type(), Identifier()])
+        self.assertFalse(qualified.nullable())
+        self.assertTrue(Maybe(ParseKind(Type())).nullable())
+        self.assertIsNone((Maybe(ParseKind(Type())) >> ParseKind(Type())).first())
+
+    def test_recursive_rules(self):
+        item = Rule('item')
+        word = Rule('word')
+        word.define(ParseKind(Identifier()))
+        item.define(word | Drop(ParseKind(Type())) >> item)
+        outer = Rule('outer')
+        outer.define(Repeat(item))
+        self.assertFalse(word.recursive())
+        self.assertTrue(item.recursive())
+        self.assertTrue(outer.recursive())
+        self.assertFalse(Maybe(word).recursive())
+
+    def test_or_dispatches_on_next_token(self):
+        parse_type = ParseKind(Type())
+        parse_dot = ParseKind(Symbol(SymbolType.DOT))
+        parse_identifier = ParseKind(Identifier())
+        parser = parse_type | Maybe(parse_dot) | parse_dot | parse_identifier
+        self.assertEqual(parser.dispatch(Type()),
+                         [parse_type, parser.parsers[1], parse_identifier])
+        self.assertEqual(parser.dispatch(Symbol(SymbolType.DOT)),
+                         [parser.parsers[1], parse_dot, parse_identifier])
+        self.assertEqual(parser.dispatch(Symbol(SymbolType.ASSIGN)),
+                         [parser.parsers[1], parse_identifier])
+
+    def test_joined_reuses_lists(self):
+        first, second = [], [1]
+        self.assertIs(joined(first, second), second)
+        first = [0]
+        self.assertIs(joined(first, second), first)
+        self.assertEqual(first, [0, 1])
+        self.assertIs(joined(first, []), first)
@@ -0,0 +1,92 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from lmd.util.error import ErrorReport
+from lmd.parsing import compiler, parse
+from lmd.parsing.combinators import *
+from lmd.parsing.cursor import Cursor
+
+from tests.main.common import EXAMPLES, synthetic_source
+from .test_packrat import SOURCES, tokens_of
+
+
+PIECES = [
+    'const', 'pub', 'mod', 'use', 'if', 'then', 'else', 'fn', 'x', 'y',
+    'M', 'T', '.', '=', '=>', '(', ')', '{', '}', '+', '*', '1', '2.5',
+    '"s"', '?', '\n',
+]
+
+
+def random_sources(count):
+    rng = random.Random(0)
+    for _ in range(count):
+        yield ' '.join(rng.choice(PIECES) for _ in range(rng.randrange(1, 30)))
+        yield 'const f x = ' + ' '.join(
+            rng.choice(PIECES[4:]) for _ in range(rng.randrange(1, 30)))
+
+
+class TestCompiledParser(unittest.TestCase):
+    def assert_same_parse(self, text):
+        tokens = tokens_of(text)
+        expected_report, actual_report = ErrorReport(), ErrorReport()
+        try:
+            expected = parse.parse_tokens(tokens, expected_report)
+        except Exception as error:
+            # Some error messages fail to render, both parsers must fail alike
+            with self.assertRaises(type(error), msg=text):
+                compiler.parse_tokens(tokens, actual_report)
+            return
+        actual = compiler.parse_tokens(tokens, actual_report)
+        self.assertEqual(actual, expected, text)
+        self.assertEqual(actual_report.errors, expected_report.errors, text)
+
+    def test_compiled_parser_parses_like_combinators(self):
+        for text in SOURCES:
+            self.assert_same_parse(text)
+        self.assert_same_parse(synthetic_source(20).text)
+        for file in EXAMPLES:
+            with open(file) as f:
+                self.assert_same_parse(f.read())
+
+    def test_compiled_parser_on_random_input(self):
+        for text in random_sources(500):
+            self.assert_same_parse(text)
+
+    def test_grammar_is_cached_on_disk(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(sys, 'dont_write_bytecode', False):
+            compiler.compile_grammar(parse.PROGRAM, directory)
+            files = sorted(os.listdir(directory))
+            self.assertEqual(len(files), 2)
+
+            with mock.patch.object(compiler.GrammarCompiler, 'generate') as generate:
+                program = compiler.compile_grammar(parse.PROGRAM, directory)
+                generate.assert_not_called()
+            _, values, errors = program(Cursor(tokens_of('const x = 1')), False)
+            self.assertEqual(errors, [])
+
+            other = Rule('other')
+            other.define(Repeat(parse.STATEMENT))
+            compiler.compile_grammar(other, directory)
+            self.assertEqual(len(os.listdir(directory)), 4)
+
+    def test_stale_grammars_are_removed(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(sys, 'dont_write_bytecode', False):
+            stale = ['grammar-program-plain-0000.py',
+                     'grammar-program-plain-0000.cpython-311.pyc']
+            kept = ['grammar-program-stackless-0000.py', 'other.py']
+            for name in stale + kept:
+                open(os.path.join(directory, name), 'w').close()
+
+            compiler.compile_grammar(parse.PROGRAM, directory)
+            files = os.listdir(directory)
+            self.assertEqual(len(files), 4)
+            for name in stale:
+                self.assertNotIn(name, files)
+            for name in kept:
+                self.assertIn(name, files)
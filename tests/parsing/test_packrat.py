@@ -0,0 +1,53 @@
+import unittest
+
+from lmd.main import pipeline
+from lmd.util.error import ErrorReport
+from lmd.util.source import Source
+from lmd.parsing.memo import Memo
+from lmd.parsing.parse import parse_tokens
+
+from tests.main.common import synthetic_source
+
+
+SOURCES = [
+    'const x = (a + (b * c)) 1',
+    'pub const f x = if x then fn y => y else (x',
+    'mod M { use N.T const g = M.f 1 + "s" }',
+    'const x = fn a => fn b => fn c => a b c',
+    'const = mod',
+]
+
+
+def tokens_of(text):
+    [tokens] = pipeline.run_pipeline(
+        [Source('test', text)], pipeline.front_end()[:-1])
+    return tokens
+
+
+class TestPackrat(unittest.TestCase):
+    def assert_same_parse(self, text):
+        tokens = tokens_of(text)
+        plain_report, packrat_report = ErrorReport(), ErrorReport()
+        plain = parse_tokens(tokens, plain_report)
+        packrat = parse_tokens(tokens, packrat_report, Memo())
+        self.assertEqual(packrat, plain, text)
+        self.assertEqual(packrat_report.errors, plain_report.errors)
+
+    def test_packrat_parses_like_plain_parser(self):
+        for text in SOURCES:
+            self.assert_same_parse(text)
+        self.assert_same_parse(synthetic_source(20).text)
+
+    def test_retried_terms_are_reused(self):
+        depth = 50
+        memo = Memo()
+        parse_tokens(tokens_of('const x = ' + 'fn a => ' * depth + 'a'),
+                     ErrorReport(), memo)
+        self.assertEqual(memo.statistics.hits, depth)
+        self.assertLessEqual(memo.statistics.memo_size, 2 * depth + 2)
+
+    def test_memo_is_cleared_between_statements(self):
+        memo = Memo()
+        parse_tokens(tokens_of(synthetic_source(100).text), ErrorReport(), memo)
+        self.assertGreater(memo.statistics.lookups, 100)
+        self.assertLess(memo.statistics.memo_size, 20)
@@ -0,0 +1,101 @@
+import unittest
+
+from lmd.ast.nodes import *
+from lmd.util.error import ErrorReport
+from lmd.parsing import compiler, parse, stackless
+
+from tests.main.common import EXAMPLES, synthetic_source
+from .test_packrat import SOURCES, tokens_of
+from .test_compiled import random_sources
+
+
+DEPTH = 10_000
+
+
+def only_value(program):
+    [const] = program.statements
+    return const.value
+
+
+def unwrap(expression):
+    '''
+    The single node of an expression
+    '''
+    assert isinstance(expression, ExpressionNode)
+    [node] = expression.nodes
+    return node
+
+
+class TestStackless(unittest.TestCase):
+    def assert_same_parse(self, text):
+        tokens = tokens_of(text)
+        expected_report, actual_report = ErrorReport(), ErrorReport()
+        try:
+            expected = parse.parse_tokens(tokens, expected_report)
+        except Exception as error:
+            # Some error messages fail to render, both parsers must fail alike
+            with self.assertRaises(type(error), msg=text):
+                stackless.parse_tokens(tokens, actual_report)
+            return
+        actual = stackless.parse_tokens(tokens, actual_report)
+        self.assertEqual(actual, expected, text)
+        self.assertEqual(actual_report.errors, expected_report.errors, text)
+
+    def test_stackless_parser_parses_like_combinators(self):
+        for text in SOURCES:
+            self.assert_same_parse(text)
+        self.assert_same_parse(synthetic_source(20).text)
+        for file in EXAMPLES:
+            with open(file) as f:
+                self.assert_same_parse(f.read())
+
+    def test_stackless_parser_on_random_input(self):
+        for text in random_sources(500):
+            self.assert_same_parse(text)
+
+    def test_only_unbounded_nesting_is_stackless(self):
+        source = compiler.GrammarCompiler(parse.PROGRAM, True).generate()
+        self.assertRegex(source, r'\(yield rule_\d+_expression_term, ')
+        self.assertRegex(source, r' rule_\d+_qualified_identifier\(cursor, ')
+        self.assertNotRegex(source, r'\(yield rule_\d+_qualified_identifier')
+
+    # Nodes are compared recursively, so deep trees are walked in loops
+
+    def test_deeply_nested_parentheses(self):
+        text = 'const v = ' + '(' * DEPTH + 'x' + ')' * DEPTH
+        report = ErrorReport()
+        node = unwrap(only_value(stackless.parse_tokens(tokens_of(text), report)))
+        self.assertEqual(report.errors, [])
+        self.assertEqual((node.span.begin, node.span.end), (10, len(text)))
+        for _ in range(DEPTH):
+            self.assertIsInstance(node, ParenthesisedExpressionNode)
+            node = unwrap(node.expression)
+        self.assertIsInstance(node, QualifiedIdentifierNode)
+
+    def test_deeply_nested_ifs(self):
+        text = 'const v = ' + 'if x then ' * DEPTH + 'x' + ' else x' * DEPTH
+        report = ErrorReport()
+        node = unwrap(only_value(stackless.parse_tokens(tokens_of(text), report)))
+        self.assertEqual(report.errors, [])
+        for _ in range(DEPTH):
+            self.assertIsInstance(node, IfNode)
+            self.assertIsInstance(unwrap(node.false_branch), QualifiedIdentifierNode)
+            node = unwrap(node.true_branch)
+        self.assertIsInstance(node, QualifiedIdentifierNode)
+
+    def test_deeply_nested_fns(self):
+        text = 'const v = ' + 'fn a => ' * DEPTH + 'a'
+        report = ErrorReport()
+        node = unwrap(only_value(stackless.parse_tokens(tokens_of(text), report)))
+        self.assertEqual(report.errors, [])
+        for _ in range(DEPTH):
+            self.assertIsInstance(node, FnNode)
+            node = unwrap(node.body)
+        self.assertIsInstance(node, QualifiedIdentifierNode)
+
+    def test_deeply_nested_unclosed_parentheses(self):
+        depth = 2 * DEPTH
+        text = 'const v = ' + '(' * depth + 'x'
+        report = ErrorReport()
+        stackless.parse_tokens(tokens_of(text), report)
+        self.assertEqual(len(report.errors), depth)
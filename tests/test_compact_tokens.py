@@ -0,0 +1,77 @@
+import unittest
+
+from lmd.util.compact import CompactTokens
+from lmd.util.error import ErrorReport
+from lmd.util.source import *
+from lmd.util.token import Token
+from lmd.lexing import pattern_lex
+from lmd.cooking import cook
+from lmd.cooking import tokens as cooked_token
+from lmd.parsing.parse import parse_tokens
+
+
+TEXT = 'const f x = if x then "a\\tb" else 0x1F + 2.5 -- done\n'
+
+
+def cooked_tokens(text):
+    src = Source('test', text)
+    report = ErrorReport()
+    tokens = cook.cook_tokens(pattern_lex.lex_source(src), report)
+    return src, tokens
+
+
+class TestCompactTokens(unittest.TestCase):
+    def test_views_equal_original_tokens(self):
+        src, tokens = cooked_tokens(TEXT)
+        compact = CompactTokens.from_tokens(src, tokens)
+        self.assertEqual(len(compact), len(tokens))
+        self.assertEqual(list(compact), tokens)
+
+    def test_payloads_are_restored(self):
+        src, tokens = cooked_tokens(TEXT)
+        compact = CompactTokens.from_tokens(src, tokens)
+        kinds = [view.kind for view in compact]
+        self.assertIn(cooked_token.String('a\tb'), kinds)
+        self.assertIn(cooked_token.Integer(16, 31), kinds)
+        self.assertIn(cooked_token.Float(2.5), kinds)
+
+    def test_equal_kinds_share_a_code(self):
+        src, tokens = cooked_tokens('x y z 1 2 3')
+        compact = CompactTokens.from_tokens(src, tokens)
+        self.assertEqual(len(compact.kind_table), 3)
+
+    def test_explicit_text_is_kept(self):
+        src = Source('test', 'abc')
+        token = Token(Span(src, 0, 3), cooked_token.Identifier(), 'xyz')
+        compact = CompactTokens.from_tokens(src, [token])
+        self.assertEqual(compact[0].text, 'xyz')
+        self.assertEqual(compact[0], token)
+
+    def test_negative_index_and_slice(self):
+        src, tokens = cooked_tokens(TEXT)
+        compact = CompactTokens.from_tokens(src, tokens)
+        self.assertEqual(compact[-1], tokens[-1])
+        self.assertEqual(compact[2:5], tokens[2:5])
+
+    def test_parser_accepts_compact_tokens(self):
+        src, tokens = cooked_tokens(TEXT)
+        tokens = list(cook.iter_significant(tokens))
+        compact = CompactTokens.from_tokens(src, tokens)
+        expected = parse_tokens(tokens, ErrorReport())
+        actual = parse_tokens(compact, ErrorReport())
+        self.assertEqual(actual, expected)
+
+    def test_payloads_are_interned_and_kinds_cached(self):
+        src, tokens = cooked_tokens('1 1 1.0 2')
+        compact = CompactTokens.from_tokens(src, tokens)
+        self.assertEqual(len(compact.payload_table), 3)
+        self.assertIs(compact[0].kind, compact[2].kind)
+        self.assertIsNot(compact[0].kind, compact[4].kind)
+        self.assertEqual(list(compact), tokens)
+
+    def test_columns_are_narrow(self):
+        src, tokens = cooked_tokens(TEXT)
+        compact = CompactTokens.from_tokens(src, tokens)
+        for column in [compact.begins, compact.ends, compact.leading,
+                       compact.trailing, compact.symbols]:
+            self.assertEqual(column.itemsize, 4)
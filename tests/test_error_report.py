@@ -0,0 +1,68 @@
+import unittest
+
+from lmd.util.error import *
+from lmd.util.source import *
+from lmd.lexing import lex, pattern_lex
+
+
+def error(src, index):
+    return Error(Message(Span(src, index, index + 1), 'error'))
+
+
+class TestErrorReport(unittest.TestCase):
+    def test_report_without_budget_keeps_all_errors(self):
+        src = Source('test', 'x' * 100)
+        report = ErrorReport()
+        for i in range(100):
+            report.add(error(src, i))
+        self.assertEqual(len(report.errors), 100)
+        self.assertFalse(report.exhausted())
+
+    def test_errors_past_budget_are_dropped(self):
+        src = Source('test', 'x' * 100)
+        report = ErrorReport(max_errors=3)
+        for i in range(10):
+            report.add(error(src, i))
+        self.assertEqual(len(report.errors), 3)
+        self.assertTrue(report.exhausted())
+
+    def test_stop_adds_one_summary(self):
+        src = Source('test', 'x' * 100)
+        report = ErrorReport(max_errors=1)
+        report.add(error(src, 0))
+        report.stop(Span(src, 5, 6))
+        report.stop(Span(src, 7, 8))
+        self.assertEqual(len(report.errors), 2)
+        self.assertEqual(report.errors[-1].reason.comment,
+                         'Too many errors, stopping after 1')
+
+    def test_exhausted_counts_pending_errors(self):
+        src = Source('test', 'x' * 100)
+        report = ErrorReport(max_errors=3)
+        report.add(error(src, 0))
+        self.assertFalse(report.exhausted(1))
+        self.assertTrue(report.exhausted(2))
+
+    def test_lexers_stop_when_budget_is_exhausted(self):
+        src = Source('test', 'a b c')
+        for lexer in [lex, pattern_lex]:
+            report = ErrorReport(max_errors=1)
+            tokens = lexer.iter_source(src, 0, report)
+            self.assertEqual(next(tokens).text, 'a')
+            report.add(error(src, 0))
+            self.assertEqual(list(tokens), [])
+            self.assertEqual(report.errors[-1].reason.span, Span(src, 1, 1))
+            self.assertEqual(lexer.lex_source(src, report), [])
+
+
+    def test_stop_at_newline_points_at_its_beginning(self):
+        src = Source('test', 'a\n\n\nb')
+        for lexer in [lex, pattern_lex]:
+            report = ErrorReport(max_errors=1)
+            tokens = lexer.iter_source(src, 0, report)
+            self.assertEqual(next(tokens).text, 'a')
+            report.add(error(src, 0))
+            self.assertEqual(list(tokens), [])
+            span = report.errors[-1].reason.span
+            self.assertEqual(span, Span(src, 1, 1))
+            self.assertEqual(len(span.split()), 1)
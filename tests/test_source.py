@@ -0,0 +1,69 @@
+import random
+import unittest
+import weakref
+
+from lmd.util.source import *
+
+
+TEXT = 'const x = 1\n\nmod M {\n  const y = x\n}\n'
+
+
+class TestSource(unittest.TestCase):
+    def test_line_index_is_built_lazily(self):
+        src = Source('test', TEXT)
+        self.assertIsNone(src._line_starts)
+        src.index_to_line_and_column(0)
+        self.assertIsNotNone(src._line_starts)
+
+    def test_index_to_line_and_column(self):
+        src = Source('test', TEXT)
+        self.assertEqual(src.index_to_line_and_column(0), (0, 0))
+        self.assertEqual(src.index_to_line_and_column(11), (0, 11))
+        self.assertEqual(src.index_to_line_and_column(12), (1, 0))
+        self.assertEqual(src.index_to_line_and_column(TEXT.index('y')), (3, 8))
+        self.assertEqual(src.index_to_line_and_column(len(TEXT)), (5, 0))
+
+    def test_lines(self):
+        src = Source('test', 'a\r\nb\n\nc')
+        self.assertEqual([src.lines[i] for i in range(len(src.lines))],
+                         ['a', 'b', '', 'c'])
+        self.assertEqual(src.index_to_line_and_column(3), (1, 0))
+
+    def test_batch_matches_single_lookups(self):
+        src = Source('test', TEXT * 10)
+        rng = random.Random(0)
+        indices = [rng.randrange(src.len() + 1) for _ in range(200)]
+        self.assertEqual(src.indices_to_lines_and_columns(indices),
+                         [src.index_to_line_and_column(i) for i in indices])
+        self.assertEqual(src.indices_to_lines_and_columns([]), [])
+        far = [src.len() - 3, 5, src.len()]
+        self.assertEqual(src.indices_to_lines_and_columns(far),
+                         [src.index_to_line_and_column(i) for i in far])
+
+    def test_split_span(self):
+        src = Source('test', TEXT)
+        begin = TEXT.index('mod')
+        end = TEXT.index('}') + 1
+        self.assertEqual([src.slice(span.begin, span.end) for span in src.split_span(begin, end)],
+                         ['mod M {', '  const y = x', '}'])
+
+    def test_span_is_slotted(self):
+        src = Source('test', TEXT)
+        span = Span(src, 2, 5)
+        self.assertIs(span.source, src)
+        self.assertFalse(hasattr(span, '__dict__'))
+        self.assertEqual(span, Span(src, 2, 5))
+        self.assertNotEqual(span, Span(Source('test', TEXT), 2, 5))
+        self.assertEqual(repr(span), 'test:2:5')
+
+    def test_sources_are_not_kept_alive(self):
+        src = Source('test', TEXT)
+        span = Span(src, 2, 5)
+        reference = weakref.ref(src)
+        del src, span
+        self.assertIsNone(reference())
+
+    def test_wrapping_span(self):
+        src = Source('test', TEXT)
+        spans = [Span(src, 4, 6), Span(src, 1, 3), Span(src, 5, 9)]
+        self.assertEqual(wrapping_span(spans), Span(src, 1, 9))
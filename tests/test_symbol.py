@@ -0,0 +1,48 @@
+import unittest
+
+from lmd.util.error import ErrorReport
+from lmd.util.source import *
+from lmd.util.symbol import SymbolTable
+from lmd.util.token import Token
+from lmd.lexing import pattern_lex
+from lmd.cooking.cook import cook_tokens
+from lmd.cooking.tokens import Identifier
+from lmd.main import pipeline
+
+
+class TestSymbolTable(unittest.TestCase):
+    def test_intern_returns_same_id_for_same_text(self):
+        table = SymbolTable()
+        x = table.intern('x')
+        y = table.intern('y')
+        self.assertEqual(table.intern('x'), x)
+        self.assertNotEqual(x, y)
+        self.assertEqual(table.text(y), 'y')
+        self.assertEqual(len(table), 2)
+
+    def test_cooked_names_and_operators_carry_symbols(self):
+        src = Source('test', 'const f x = x ++ f T x')
+        table = SymbolTable()
+        tokens = cook_tokens(pattern_lex.lex_source(src), ErrorReport(), table)
+        symbols = {token.text: token._symbol for token in tokens}
+        self.assertIsNone(symbols['const'])
+        self.assertIsNone(symbols['='])
+        for text in ['f', 'x', '++', 'T']:
+            self.assertEqual(table.text(symbols[text]), text)
+        names = [token for token in tokens if token.text == 'x']
+        self.assertEqual(len({token.symbol for token in names}), 1)
+
+    def test_tokens_built_by_hand_are_interned_by_the_table(self):
+        src = Source('test', 'x')
+        token = Token(Span(src, 0, 1), Identifier())
+        self.assertIsNone(token.symbol)
+        table = SymbolTable()
+        self.assertEqual(table.of(token), table.intern('x'))
+        self.assertEqual(len(table), 1)
+
+    def test_compilations_have_tables_of_their_own(self):
+        srcs = [Source('a', 'const x = y'), Source('b', 'const y = 1')]
+        tables = [SymbolTable(), SymbolTable()]
+        for table in tables:
+            pipeline.run_pipeline(srcs, pipeline.front_end(symbols=table))
+        self.assertEqual([len(table) for table in tables], [2, 2])
@@ -32,6 +32,14 @@ class MockTwo(MockKind):
         self.value_two = value_two
 
 
+class MockPayload(MockKind):
+    payload_attrs = ('value',)
+
+    def __init__(self, value):
+        super().__init__(MockType.ONE)
+        self.value = value
+
+
 class TestTokens(unittest.TestCase):
     def test_kind_extends_itself(self):
         kind = MockKind(MockType.ONE)
@@ -56,3 +64,37 @@ class TestTokens(unittest.TestCase):
         kind = MockOne(1)
         base = MockOne(2)
         self.assertFalse(kind.extends(base))
+
+    def test_kind_does_not_extend_sibling_kind(self):
+        self.assertFalse(MockOne(1).extends(MockTwo(1)))
+        self.assertFalse(MockTwo(1).extends(MockOne(1)))
+
+    def test_kind_code_is_updated_for_new_base_kinds(self):
+        kind = MockOne(3)
+        self.assertTrue(kind.extends(MockKind(MockType.ONE)))
+        self.assertTrue(kind.extends(MockOne(3)))
+        self.assertFalse(kind.extends(MockOne(4)))
+
+    def test_extends_matches_attribute_comparison(self):
+        kinds = [TokenKind(MockTokenType.SIMPLE), MockKind(MockType.ONE),
+                 MockKind(MockType.TWO), MockOne(1), MockOne(2), MockTwo(1)]
+        for kind in kinds:
+            for base in kinds:
+                expected = isinstance(kind, type(base)) and all(
+                    getattr(kind, attr) == value
+                    for attr, value in base.kind_attrs().items())
+                self.assertEqual(kind.extends(base), expected, (kind, base))
+
+    def test_kinds_without_payload_are_shared(self):
+        self.assertIs(MockOne(1), MockOne(1))
+        self.assertIs(MockKind(MockType.TWO), MockKind(MockType.TWO))
+        self.assertIsNot(MockOne(1), MockOne(2))
+        self.assertIsNot(MockKind(MockType.ONE), MockOne(1))
+
+    def test_kinds_with_payload_are_not_shared(self):
+        kind = MockPayload(1)
+        self.assertIsNot(kind, MockPayload(1))
+        self.assertEqual(kind, MockPayload(1))
+        self.assertTrue(kind.extends(MockKind(MockType.ONE)))
+        self.assertTrue(kind.extends(MockPayload(1)))
+        self.assertFalse(kind.extends(MockPayload(2)))